@@ -0,0 +1,97 @@
+import numpy as np
+from RandomStream import RandomStream, stream
+
+
+def segments(k: int, n: int, rng: RandomStream = None) -> (np.ndarray, np.ndarray):
+    """
+    Draw k pairs of different positions in a route of n cities.
+    :param k: the number of pairs
+    :param n: the number of cities
+    :param rng: the RandomStream of the run
+    :return: a tuple which represents (smaller positions, larger positions)
+    """
+    first, second = stream(rng).pairs(n, k)
+    return np.minimum(first, second), np.maximum(first, second)
+
+
+def order_crossover(parents1: np.ndarray, parents2: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Do the Order Crossover for k parent pairs at once. Row i of the result
+    is the offspring Population.crossover builds from parents1[i] and
+    parents2[i] with the crossFragment starts[i]..ends[i].
+    :param parents1: a (k, n) array of routes, the fragments are kept from these
+    :param parents2: a (k, n) array of routes, the rest is filled from these
+    :param starts: the first position of each crossFragment
+    :param ends: the last position of each crossFragment
+    :return: a (k, n) array of offspring routes
+    """
+    k, n = parents1.shape
+    rows = np.arange(k)[:, None]
+    columns = np.arange(n)[None, :]
+    in_cross = (columns >= starts[:, None]) & (columns <= ends[:, None])
+    position1 = np.empty_like(parents1)
+    position1[rows, parents1] = columns
+
+    # parents2 read from end + 1 on, the cities of the crossFragment are moved to the back
+    order = (ends[:, None] + 1 + columns) % n
+    read = parents2[rows, order]
+    keep = ~in_cross[rows, position1[rows, read]]
+    sort2 = read[rows, np.argsort(~keep, axis=1, kind='stable')]
+
+    offspring = parents1.copy()
+    fill = columns < (n - (ends - starts + 1))[:, None]
+    offspring[np.broadcast_to(rows, (k, n))[fill], order[fill]] = sort2[fill]
+    return offspring
+
+
+def crossover(crossover_method: int, parents1: np.ndarray, parents2: np.ndarray,
+              rng: RandomStream = None) -> np.ndarray:
+    """
+    Do the crossover operation for k parent pairs at once.
+    :param crossover_method: the crossover method, see Population.crossover.
+    Only 1 (Order Crossover) has a batched version.
+    :param parents1: a (k, n) array of the first parents
+    :param parents2: a (k, n) array of the second parents
+    :param rng: the RandomStream of the run
+    :return: a (2k, n) array, rows 2i and 2i + 1 are the offspring of pair i
+    """
+    if crossover_method != 1:
+        raise ValueError("Value is not permitted")
+    k, n = parents1.shape
+    starts, ends = segments(k, n, rng)
+    offspring = np.empty((2 * k, n), dtype=parents1.dtype)
+    offspring[0::2] = order_crossover(parents1, parents2, starts, ends)
+    offspring[1::2] = order_crossover(parents2, parents1, starts, ends)
+    return offspring
+
+
+def mutation(mutation_method: int, routes: np.ndarray, rows: np.ndarray, rng: RandomStream = None) -> None:
+    """
+    Do the mutation operation in place on some rows of a route array.
+    :param mutation_method: the mutation method, see Individual.mutation.
+    1 (insert), 2 (swap) and 3 (inversion) have a batched version.
+    :param routes: an (m, n) array of routes
+    :param rows: the indices of the rows to mutate
+    :param rng: the RandomStream of the run
+    """
+    if mutation_method not in (1, 2, 3):
+        raise ValueError("Value is not permitted")
+    n = routes.shape[1]
+    first, second = segments(len(rows), n, rng)
+    columns = np.arange(n)[None, :]
+    first, second = first[:, None], second[:, None]
+
+    # The insert method, route[second] moves behind route[first]
+    if mutation_method == 1:
+        index = np.where((columns > first + 1) & (columns <= second), columns - 1, columns)
+        index = np.where(columns == first + 1, second, index)
+
+    # The swap method
+    elif mutation_method == 2:
+        index = np.where(columns == first, second, np.where(columns == second, first, columns))
+
+    # The Inversion method, route[first:second] is reversed
+    else:
+        index = np.where((columns >= first) & (columns < second), first + second - 1 - columns, columns)
+
+    routes[rows] = np.take_along_axis(routes[rows], index, axis=1)
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class CandidateList:
+    def __init__(self, coordinates, k: int = 10, leaf_size: int = 32):
+        """
+        Initial the k nearest neighbours of every city. The cities are split
+        at the median of the longer side of their bounding box until no part
+        (a leaf) holds more than leaf_size cities, so clustered cities get
+        small leaves where a uniform grid would put them all into a few
+        cells. The neighbours are searched a leaf at a time among the leaves
+        near it, which keeps the distance arrays at leaf_size times the
+        cities of those leaves.
+        :param coordinates: an (n, 2) array, the i-th row is the i-th city
+        :param k: the number of neighbours of a city
+        :param leaf_size: the largest number of cities in a leaf
+        """
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        n = len(self.coordinates)
+        self.k = min(k, n - 1)
+        # neighbours[i] are the k nearest cities of city i, the nearest first, the smaller index first on a tie
+        self.neighbours = np.empty((n, self.k), dtype=np.int32)
+        if self.k <= 0:
+            return
+
+        self.leaves = self.split(np.arange(n), max(leaf_size, 1))
+        # the bounding boxes of the leaves, one array per side
+        self.low_x, self.low_y = np.array([self.coordinates[leaf].min(axis=0) for leaf in self.leaves]).T.copy()
+        self.high_x, self.high_y = np.array([self.coordinates[leaf].max(axis=0) for leaf in self.leaves]).T.copy()
+        # the number of nearest leaves which surely hold k other cities
+        self.first = min(int(np.ceil((self.k + 1) / min(len(leaf) for leaf in self.leaves))), len(self.leaves))
+        for i, leaf in enumerate(self.leaves):
+            self.search(leaf, i)
+
+    def split(self, points: np.ndarray, leaf_size: int) -> list:
+        """
+        Split cities at the median until every part has at most leaf_size of them.
+        :return: a list of arrays of city indices, the leaves
+        """
+        leaves, parts = [], [points]
+        while parts:
+            part = parts.pop()
+            if len(part) <= leaf_size:
+                leaves.append(part)
+                continue
+            coordinates = self.coordinates[part]
+            axis = int(np.argmax(coordinates.max(axis=0) - coordinates.min(axis=0)))
+            # split by rank, so equal coordinates still end up in two halves
+            order = np.argpartition(coordinates[:, axis], len(part) // 2, kind='introselect')
+            parts.append(part[order[:len(part) // 2]])
+            parts.append(part[order[len(part) // 2:]])
+        return leaves
+
+    def gaps(self, leaf: int) -> np.ndarray:
+        """
+        :return: the squared distance between the bounding box of a leaf and that of every leaf
+        """
+        x = np.maximum(np.maximum(self.low_x - self.high_x[leaf], self.low_x[leaf] - self.high_x), 0.)
+        y = np.maximum(np.maximum(self.low_y - self.high_y[leaf], self.low_y[leaf] - self.high_y), 0.)
+        return x * x + y * y
+
+    def search(self, points: np.ndarray, leaf: int) -> None:
+        """
+        Find the neighbours of the cities of a leaf. They are first searched
+        in the nearest leaves which hold k other cities (at least all the
+        leaves which touch this one), then in every leaf within the k-th
+        distance found, so no nearer city can be missed.
+        """
+        gaps = self.gaps(leaf)
+        first = np.flatnonzero(gaps <= np.partition(gaps, self.first - 1)[self.first - 1])
+        candidates = np.concatenate([self.leaves[i] for i in first])
+        kth = np.partition(self.distances(points, candidates), self.k, axis=1)[:, self.k].max()
+        # in the order of the city indices, so sorting by distance and then column puts the smaller index first
+        candidates = np.sort(np.concatenate([self.leaves[i] for i in np.flatnonzero(gaps <= kth * kth)]))
+
+        distance = self.distances(points, candidates)
+        rows = np.arange(len(points))[:, None]
+        columns = np.argpartition(distance, self.k, axis=1)[:, :self.k + 1]
+        columns = np.take_along_axis(columns, np.lexsort((columns, distance[rows, columns]), axis=1), axis=1)
+        # a city as far as the last one taken may have been left out for one with a larger index
+        tied = np.flatnonzero(np.count_nonzero(distance <= distance[rows, columns[:, -1:]], axis=1) > self.k + 1)
+        if len(tied):
+            columns[tied] = np.argsort(distance[tied], axis=1, kind='stable')[:, :self.k + 1]
+        nearest = candidates[columns]
+        # the city itself is at distance 0, after any city at the same place with a smaller index
+        itself = np.argsort(nearest == points[:, None], axis=1, kind='stable')
+        self.neighbours[points] = nearest[rows, itself][:, :self.k]
+
+    def distances(self, points: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        x, y = self.coordinates[:, 0], self.coordinates[:, 1]
+        return np.sqrt((x[points][:, None] - x[candidates]) ** 2 + (y[points][:, None] - y[candidates]) ** 2)
+
+    def __getitem__(self, city: int) -> np.ndarray:
+        return self.neighbours[city]
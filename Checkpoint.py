@@ -0,0 +1,56 @@
+import os
+import json
+import numpy as np
+
+
+def route_dtype(n: int):
+    """
+    The smallest integer type which holds the city indices of n cities.
+    """
+    return np.int16 if n <= np.iinfo(np.int16).max else np.int32
+
+
+def save(file_name: str, algorithm, **extra) -> None:
+    """
+    Write the state of a run: the population array, the cached route
+    lengths, the generation, the number of evaluations and the state of
+    the RandomStream of the problem. The file is written next to its final
+    name and renamed, so a run which dies while saving leaves the last
+    checkpoint intact.
+    :param file_name: the .npz file
+    :param algorithm: the EvolutionaryAlgorithm
+    :param extra: arrays of the caller which are saved too, see load
+    """
+    population = algorithm.Problem.population
+    costs = population.route_distances()
+    state = algorithm.Problem.rng.get_state()
+    temporary = file_name + '.tmp.npz'
+    np.savez(temporary, routes=population.routes.astype(route_dtype(population.routes.shape[1])), costs=costs,
+             generation=algorithm.generation, evaluations=population.evaluations,
+             generator=json.dumps(state['generator']), buffer=np.array(state['buffer'], dtype=np.float64),
+             **{'extra_' + key: value for key, value in extra.items()})
+    os.replace(temporary, file_name)
+
+
+def load(file_name: str, algorithm) -> dict:
+    """
+    Restore a run saved by save. The generations which follow are the same,
+    bit for bit, as those of the run which was saved.
+    :param file_name: the .npz file
+    :param algorithm: an EvolutionaryAlgorithm of the same problem and population size
+    :return: the extra arrays given to save
+    """
+    with np.load(file_name) as checkpoint:
+        population = algorithm.Problem.population
+        if checkpoint['routes'].shape != population.routes.shape:
+            raise ValueError("%s is a checkpoint of another problem or population size" % file_name)
+        population.change_routes(checkpoint['routes'])
+        for individual, cost in zip(population.individual_list, checkpoint['costs'].tolist()):
+            individual.cost = cost
+        population.evaluations = int(checkpoint['evaluations'])
+        algorithm.generation = int(checkpoint['generation'])
+        algorithm.Problem.update_fitness()
+
+        algorithm.Problem.rng.set_state({'generator': json.loads(str(checkpoint['generator'])),
+                                         'buffer': checkpoint['buffer'].tolist()})
+        return {key[len('extra_'):]: checkpoint[key] for key in checkpoint.files if key.startswith('extra_')}
@@ -0,0 +1,116 @@
+import hashlib
+import numpy as np
+
+
+def canonical(routes: np.ndarray) -> np.ndarray:
+    """
+    Write routes so that the same tour always gives the same row, whatever
+    its starting city and direction: rotated to start at city 0 and going
+    on to the smaller of the two neighbours of city 0.
+    :param routes: an (m, n) array of routes, or one route
+    :return: an (m, n) array
+    """
+    routes = np.atleast_2d(routes)
+    n = routes.shape[1]
+    order = (np.argmin(routes, axis=1)[:, None] + np.arange(n)) % n
+    rotated = np.take_along_axis(routes, order, axis=1)
+    if n > 2:
+        flip = rotated[:, 1] > rotated[:, -1]
+        rotated[flip, 1:] = rotated[flip, :0:-1]
+    return rotated
+
+
+def tour_hashes(routes: np.ndarray) -> list:
+    """
+    Hash tours independently of their rotation and direction, two routes
+    get the same hash when they are the same tour.
+    :param routes: an (m, n) array of routes, or one route
+    :return: a list of m 64-bit integers
+    """
+    return [int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8).digest(), 'little')
+            for row in canonical(routes).astype(np.int32)]
+
+
+def entropy_term(counts: np.ndarray) -> np.ndarray:
+    """
+    c * log(c), 0 for c = 0.
+    """
+    counts = counts.astype(np.float64)
+    return counts * np.log(np.maximum(counts, 1.))
+
+
+class EdgeFrequency:
+    def __init__(self, n: int):
+        """
+        Initial a table of how many routes use every edge. Only the edges
+        in use are kept, as sorted edge ids with their counts, and the
+        entropy of the edge distribution is updated from the counts which
+        change, so replacing a few routes only touches their edges.
+        :param n: the number of cities
+        """
+        self.n = n
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.total = 0
+        # the sum of c * log(c) over the counts
+        self.sum = 0.
+
+    def edges(self, routes: np.ndarray) -> np.ndarray:
+        """
+        :return: the ids of the edges of routes, an edge {a, b} with a < b has the id a * n + b
+        """
+        routes = np.atleast_2d(routes).astype(np.int64)
+        following = np.roll(routes, -1, axis=1)
+        return (np.minimum(routes, following) * self.n + np.maximum(routes, following)).ravel()
+
+    def update(self, added: np.ndarray, removed: np.ndarray = None) -> None:
+        """
+        Count the edges of the added routes and forget those of the removed ones.
+        :param added: an (m, n) array of routes which came into the population
+        :param removed: an (m', n) array of routes which left it
+        """
+        ids = self.edges(added)
+        signs = np.ones(len(ids), dtype=np.int64)
+        if removed is not None and len(removed):
+            removed_ids = self.edges(removed)
+            ids = np.concatenate((ids, removed_ids))
+            signs = np.concatenate((signs, -np.ones(len(removed_ids), dtype=np.int64)))
+        ids, inverse = np.unique(ids, return_inverse=True)
+        delta = np.bincount(inverse.ravel(), weights=signs, minlength=len(ids)).astype(np.int64)
+        ids, delta = ids[delta != 0], delta[delta != 0]
+
+        position = np.searchsorted(self.keys, ids)
+        new = position == len(self.keys)
+        new[~new] = self.keys[position[~new]] != ids[~new]
+        if new.any():
+            self.keys = np.insert(self.keys, position[new], ids[new])
+            self.counts = np.insert(self.counts, position[new], 0)
+            position = np.searchsorted(self.keys, ids)
+        old = self.counts[position]
+        self.counts[position] = old + delta
+        self.sum += float(np.sum(entropy_term(old + delta) - entropy_term(old)))
+        self.total += int(delta.sum())
+
+        unused = self.counts == 0
+        if 2 * np.count_nonzero(unused) > len(self.counts):
+            self.keys, self.counts = self.keys[~unused], self.counts[~unused]
+            self.sum = float(np.sum(entropy_term(self.counts)))
+
+    def entropy(self) -> float:
+        """
+        :return: the entropy of the share of every edge among all the edges
+        """
+        if self.total == 0:
+            return 0.
+        return float(np.log(self.total) - self.sum / self.total)
+
+    def diversity(self, population_number: int) -> float:
+        """
+        The edge entropy normalized to (H - log n) / log population_number:
+        0 when all the routes are the same tour and 1 when no two routes
+        share an edge.
+        """
+        if population_number < 2 or self.n < 2:
+            return 0.
+        value = (self.entropy() - np.log(self.n)) / np.log(population_number)
+        return float(min(max(value, 0.), 1.))
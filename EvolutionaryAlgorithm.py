@@ -1,28 +1,324 @@
+import os
+import time
 from TSPProblem import *
+import BatchOperators
+import Checkpoint
+import Replacement
+import Diversity
+from Instrumentation import timer
+
+
 class EvolutionaryAlgorithm:
-    def __init__(self,Problem:TSPProblem,Algorithm):
+    def __init__(self,Problem:TSPProblem,Algorithm,batched=False,local_search=None,profiler=None,replacement=1):
+        """
+        :param Problem: the TSP Problem to solve
+        :param Algorithm: [selection_method, crossover_method, mutation_method]
+        :param batched: produce all the offspring of a generation with the
+        array kernels of BatchOperators. Operators without a batched version
+        fall back to Population.crossover and Individual.mutation.
+        :param local_search: a LocalSearch applied to the offspring of every
+        generation (memetic mode), within its per-generation budget
+        :param profiler: an Instrumentation.Profiler which times the operators
+        of this run and of its problem, None disables the timers
+        :param replacement: how the offspring enter the population.
+        This is the mapping chart:
+
+        replacement | real_method
+        1 -> generational, the offspring replace the whole population
+        2 -> steady-state, offspring_number offspring (2 by default) replace the worst individuals
+        3 -> (mu + lambda), the best of the population and its offspring survive
+        4 -> (mu, lambda), the best offspring and the elites best individuals survive
+
+        2 to 4 update the population array in place, see Replacement.
+        """
         self.Problem=Problem
         self.Algorithm=Algorithm
         self.mutationRate=0.4
+        self.replacement=replacement
+        self.offspring_number=None  # Self-setting lambda, 2 for steady-state and the population size otherwise
+        self.elites=1  # Self-setting number of survivors of (mu, lambda)
+        self.unique=False  # Self-setting: keep duplicate tours out of the offspring, see distinct
+        self.unique_retries=2  # Self-setting number of mutations of a duplicate before it is rejected
+        self.rejected=0  # the number of duplicate offspring rejected so far
+        self.local_search=local_search
+        self.batched=batched and self.Algorithm[1]==1 and self.Algorithm[2] in (1, 2, 3)
+        self.generation=0
+        self.stop_reason=None
+        # the best cost so far and the generation it was found in, for the stall rule of stopping
+        self.best_cost=float('inf')
+        self.best_generation=0
+        self.profiler=profiler
+        self.Problem.profiler=profiler
+        self.Problem.population.profiler=profiler
+        self.hooks=[]
+        self.checkpoint_file=None
+        self.checkpoint_every=None
+
+    def checkpoints(self, file_name, every):
+        """
+        Save a checkpoint to file_name after every `every` generations, see
+        Checkpoint.save. resume continues the run from it.
+        """
+        self.checkpoint_file=file_name
+        self.checkpoint_every=every
+
+    def save(self, file_name, **extra):
+        Checkpoint.save(file_name, self, **extra)
+
+    def resume(self, file_name):
+        """
+        Continue from a checkpoint if file_name exists.
+        :return: the extra arrays of the checkpoint, None if there is none
+        """
+        if not os.path.exists(file_name):
+            return None
+        return Checkpoint.load(file_name, self)
+
+    def add_hook(self, hook):
+        """
+        Call hook after every generation with a dict of generation, best,
+        mean, diversity, edge_entropy (see Population.edge_entropy) and
+        seconds (the time of the generation). A Profiler
+        can be a hook, it keeps the events for its CSV/JSON export.
+        """
+        self.hooks.append(hook)
+
     def run(self):
-        temp=self.Problem.selection(int(self.Algorithm[0]))
+        """
+        Evolve one generation.
+        """
+        start=time.perf_counter()
+        with timer(self.profiler, 'generation'):
+            if self.replacement!=1:
+                self.run_replacement()
+            elif self.batched:
+                self.run_batched()
+            else:
+                self.run_pairs()
+        self.generation+=1
+        if self.hooks:
+            costs=self.Problem.population.route_distances()
+            event={'generation': self.generation, 'best': float(costs.min()), 'mean': float(costs.mean()),
+                   'diversity': self.Problem.population.diversity(),
+                   'edge_entropy': self.Problem.population.edge_entropy(), 'seconds': time.perf_counter() - start}
+            for hook in self.hooks:
+                hook(event)
+        if self.checkpoint_file is not None and self.generation % self.checkpoint_every == 0:
+            with timer(self.profiler, 'checkpoint'):
+                self.save(self.checkpoint_file)
+
+    def run_pairs(self):
+        """
+        One generation where the offspring are produced pair by pair.
+        """
+        with timer(self.profiler, 'selection', self.Algorithm[0]):
+            temp=self.Problem.selection(int(self.Algorithm[0]))
+        if self.unique:
+            offsprings=self.distinct(lambda number: self.breed(temp, number), self.Problem.size, (), True)
+        else:
+            offsprings=self.breed(temp, self.Problem.size)
+
+        self.Problem.population.change(offsprings)
+        self.improve()
+        self.Problem.update_fitness()
+
+    def breed(self, temp, number):
+        """
+        Produce at least number offspring, pair by pair, from random pairs of
+        the selected individuals. The parent pairs and the mutation decisions
+        of the whole generation are drawn at once.
+        :return: a list of the offspring
+        """
+        rng=self.Problem.rng
+        pairs=(number + 1) // 2
+        first, second=rng.pairs(len(temp), pairs)
+        mutate=(rng.generator.random(2 * pairs) <= self.mutationRate).tolist()
         offsprings = []
-        while len(offsprings) < self.Problem.size:
-            x, y = random.sample(range(len(temp)), 2)
+        for i, (x, y) in enumerate(zip(first.tolist(), second.tolist())):
             indi1=temp[x]
             indi2=temp[y]
-            cross1, cross2=self.Problem.population.crossover(self.Algorithm[1],indi1,indi2)
-            rand = random.random()
-            if rand <= self.mutationRate:
-                cross1.mutation(self.Algorithm[2])
+            with timer(self.profiler, 'crossover', self.Algorithm[1]):
+                cross1, cross2=self.Problem.population.crossover(self.Algorithm[1],indi1,indi2)
+            if mutate[2 * i]:
+                with timer(self.profiler, 'mutation', self.Algorithm[2]):
+                    cross1.mutation(self.Algorithm[2], rng)
 
-            rand = random.random()
-            if rand <= self.mutationRate:
-                cross2.mutation(self.Algorithm[2])
+            if mutate[2 * i + 1]:
+                with timer(self.profiler, 'mutation', self.Algorithm[2]):
+                    cross2.mutation(self.Algorithm[2], rng)
 
             offsprings.append(cross1)
             offsprings.append(cross2)
+        return offsprings
 
-        self.Problem.population.change(offsprings)
+    def run_batched(self):
+        """
+        One generation where the parent pairs, the crossover and the mutation
+        are each done in a few array operations over the whole generation.
+        """
+        with timer(self.profiler, 'selection', self.Algorithm[0]):
+            temp=self.Problem.select(int(self.Algorithm[0]))
+        parents=self.Problem.population.routes[temp]
+        if self.unique:
+            offsprings=self.distinct(lambda number: self.individuals(self.breed_batched(parents, number)),
+                                     self.Problem.size, (), True)
+            offsprings=np.array([individual.route for individual in offsprings])
+        else:
+            offsprings=self.breed_batched(parents, self.Problem.size)
+
+        self.Problem.population.change_routes(offsprings)
+        self.improve()
+        self.Problem.update_fitness()
+
+    def breed_batched(self, parents, number):
+        """
+        Produce number offspring (rounded up to pairs) with the array kernels.
+        :param parents: an array of the routes of the selected individuals
+        :return: an array of the offspring routes
+        """
+        rng=self.Problem.rng
+        pairs=(number + 1) // 2
+        x, y=rng.pairs(len(parents), pairs)
+        with timer(self.profiler, 'batch crossover', self.Algorithm[1]):
+            offsprings=BatchOperators.crossover(self.Algorithm[1], parents[x], parents[y], rng)
+        mutated=np.flatnonzero(rng.generator.random(len(offsprings)) <= self.mutationRate)
+        with timer(self.profiler, 'batch mutation', self.Algorithm[2]):
+            BatchOperators.mutation(self.Algorithm[2], offsprings, mutated, rng)
+        return offsprings
+
+    def run_replacement(self):
+        """
+        One generation where offspring_number offspring are put into the
+        population array in place by a replacement scheme.
+        """
+        population=self.Problem.population
+        number=self.offspring_number or (2 if self.replacement==2 else self.Problem.size)
+        with timer(self.profiler, 'selection', self.Algorithm[0]):
+            temp=self.Problem.select(int(self.Algorithm[0]))
+        if self.batched:
+            parents=population.routes[temp]
+            breed=lambda k: self.individuals(self.breed_batched(parents, k)[:k])
+        else:
+            temp=[population.individual_list[i] for i in temp.tolist()]
+            breed=lambda k: self.breed(temp, k)[:k]
+        if self.unique:
+            # (mu, lambda) needs all its offspring, the other schemes can do with fewer
+            offsprings=self.distinct(breed, number, population.taken_hashes(), self.replacement==4)
+        else:
+            offsprings=breed(number)
+        self.improve(offsprings)
+        costs=population.evaluate(offsprings)
+        routes=np.array([individual.route for individual in offsprings], dtype=np.int32).reshape(
+            len(offsprings), population.routes.shape[1])
+        with timer(self.profiler, 'replacement', self.replacement):
+            Replacement.replace(self.replacement, population, routes, costs, self.elites)
+        self.Problem.update_fitness()
+
+    def individuals(self, routes):
+        population=self.Problem.population
+        return [Individual(route, population.city_list, population.distance) for route in routes]
+
+    def distinct(self, breed, number, seen, fill, rounds=3):
+        """
+        Produce offspring whose tours are neither in seen nor among each
+        other, before they are evaluated. A duplicate is mutated again up to
+        unique_retries times and rejected if it is still a duplicate, the
+        rejected ones are made up by breeding again for a few rounds.
+        :param breed: a function which produces at least k offspring
+        :param number: the number of offspring
+        :param seen: the tour hashes which are taken, e.g. Population.taken_hashes, it is not changed
+        :param fill: make up the offspring still missing after the rounds
+        with duplicates, so there are always number of them
+        :return: a list of the offspring
+        """
+        offsprings=[]
+        drawn=set()
+        for _ in range(rounds):
+            candidates=breed(number - len(offsprings))
+            keys=Diversity.tour_hashes(np.array([individual.route for individual in candidates]))
+            for individual, key in zip(candidates, keys):
+                for _ in range(self.unique_retries):
+                    if key not in seen and key not in drawn:
+                        break
+                    with timer(self.profiler, 'mutation', self.Algorithm[2]):
+                        individual.mutation(self.Algorithm[2], self.Problem.rng)
+                    key=individual.tour_hash()
+                if key in seen or key in drawn:
+                    self.rejected+=1
+                    continue
+                drawn.add(key)
+                offsprings.append(individual)
+                if len(offsprings)==number:
+                    return offsprings
+        if fill:
+            offsprings+=breed(number - len(offsprings))[:number - len(offsprings)]
+        return offsprings
+
+    def improve(self, individuals=None):
+        """
+        Apply the local search to the new population, or to the given
+        offspring, until its budget for this generation is spent.
+        """
+        if self.local_search is None:
+            return
+        self.local_search.reset()
+        if individuals is None:
+            individuals=self.Problem.population.individual_list
+        for individual in individuals:
+            if self.local_search.exhausted():
+                break
+            with timer(self.profiler, 'local search'):
+                self.local_search.improve(individual)
 
+    def evolve(self, generations=None, stall=None, min_diversity=None, target_cost=None, seconds=None,
+               evaluations=None) -> str:
+        """
+        Run generations until one of the stopping rules holds. Rules which
+        are None are not checked, at least one has to be given.
+        :param generations: stop when self.generation reaches this number
+        :param stall: stop after this many generations without a new best cost
+        :param min_diversity: stop when Population.diversity drops below this
+        :param target_cost: stop when the best cost is at most this
+        :param seconds: stop when this much wall-clock time has passed
+        :param evaluations: stop when the population has done this many route evaluations
+        :return: why the run stopped: 'generations', 'stall', 'diversity',
+        'target', 'time' or 'evaluations'. It is kept in self.stop_reason too.
+        """
+        if all(rule is None for rule in (generations, stall, min_diversity, target_cost, seconds, evaluations)):
+            raise ValueError("No stopping rule is given")
+        start=time.perf_counter()
+        self.best_cost=float('inf')
+        self.best_generation=self.generation
+        while self.stopping(start, generations, stall, min_diversity, target_cost, seconds, evaluations) is None:
+            self.run()
+        return self.stop_reason
 
+    def stopping(self, start, generations=None, stall=None, min_diversity=None, target_cost=None, seconds=None,
+                 evaluations=None):
+        """
+        Check the stopping rules of evolve once, before a generation. It is
+        called with the same rules every generation, which lets a caller
+        which does more between the generations (see ExperimentRunner.run_job)
+        stop like evolve does.
+        :param start: the time.perf_counter() the run started at
+        :return: the rule which holds, see evolve, None to go on
+        """
+        population=self.Problem.population
+        cost=1. / float(np.max(self.Problem.fitness))
+        if cost < self.best_cost:
+            self.best_cost, self.best_generation = cost, self.generation
+        if target_cost is not None and self.best_cost <= target_cost:
+            self.stop_reason='target'
+        elif generations is not None and self.generation >= generations:
+            self.stop_reason='generations'
+        elif stall is not None and self.generation - self.best_generation >= stall:
+            self.stop_reason='stall'
+        elif min_diversity is not None and population.diversity() < min_diversity:
+            self.stop_reason='diversity'
+        elif seconds is not None and time.perf_counter() - start >= seconds:
+            self.stop_reason='time'
+        elif evaluations is not None and population.evaluations >= evaluations:
+            self.stop_reason='evaluations'
+        else:
+            return None
+        return self.stop_reason
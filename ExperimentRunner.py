@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import zlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from TSPProblem import TSPProblem
+from EvolutionaryAlgorithm import EvolutionaryAlgorithm
+from ResultLog import SnapshotWriter
+
+# the stopping rules of EvolutionaryAlgorithm.evolve a job can have besides its generations
+stopping_rules = ['stall', 'min_diversity', 'target_cost', 'seconds', 'evaluations']
+filenames = ['eil51', 'eil76', 'eil101', 'st70', 'kroA100', 'kroC100', 'kroD100', 'lin105', 'pcb442', 'pr2392']
+
+
+def algorithm_name(algorithm) -> str:
+    return "".join('%s' % id for id in algorithm)
+
+
+def job_seed(base_seed: int, filename: str, size: int, algorithm, repeat: int) -> int:
+    """
+    Derive the seed of one job. It only depends on the job itself, so a
+    job gives the same result whichever worker runs it and in which order.
+    """
+    entropy = [base_seed, zlib.crc32(filename.encode()), size, int(algorithm_name(algorithm)), repeat]
+    return int(np.random.SeedSequence(entropy).generate_state(1)[0])
+
+
+def run_job(job: dict) -> dict:
+    """
+    Run one GA and collect what the test scripts write about it.
+    :param job: a dict with the keys filename, size, algorithm, generations
+    (None for no limit), seed, log_every (log the best route every
+    log_every generations, None logs nothing), report (the generations
+    after which the best cost is reported) and optionally batched,
+    replacement and unique (see EvolutionaryAlgorithm), the stopping_rules
+    (see EvolutionaryAlgorithm.evolve, the run stops at the first which
+    holds), snapshots (a file the logged routes go to as a binary
+    ResultLog instead of being returned as text), checkpoint (a file the
+    run is saved to every checkpoint_every generations and resumed from)
+    and result (a JSON file the result is written to; a job whose result
+    file exists is not run again)
+    :return: a dict with the logged routes, the reported costs, the final
+    cost, the seconds the run took, the generations it ran and why it
+    stopped (stop_reason, see evolve)
+    """
+    if job.get('result') and os.path.exists(job['result']):
+        with open(job['result']) as result:
+            return json.load(result)
+    start = time.perf_counter()
+    Problem = TSPProblem(job['filename'] + '.tsp', job['size'], seed=job['seed'])
+    temp = EvolutionaryAlgorithm(Problem, job['algorithm'], job.get('batched', False),
+                                 replacement=job.get('replacement', 1))
+    temp.unique = job.get('unique', False)
+    log, report = [], []
+    checkpoint = job.get('checkpoint')
+    if checkpoint:
+        extra = temp.resume(checkpoint)
+        if extra is not None:
+            log, report = extra['log'].tolist(), extra['report'].tolist()
+            start -= float(extra['seconds'])
+            temp.best_cost, temp.best_generation = float(extra['best_cost']), int(extra['best_generation'])
+    writer = None
+    if job.get('snapshots'):
+        ids = [city.seq for city in Problem.population.city_list]
+        writer = SnapshotWriter(job['snapshots'], ids, job_label(job), resume=temp.generation or None)
+    rules = {rule: job.get(rule) for rule in stopping_rules}
+    if job['generations'] is None and all(value is None for value in rules.values()):
+        raise ValueError("The job has no stopping rule")
+    while temp.stopping(start, job['generations'], **rules) is None:
+        gen = temp.generation
+        temp.run()
+        if job['log_every'] and gen % job['log_every'] == 0:
+            if writer is None:
+                solution, cost = Problem.population.findLeastCost()
+                log.append(solution)
+            else:
+                route, cost = Problem.population.best()
+                writer.write(gen, route, cost)
+        if gen + 1 in job['report']:
+            route, cost = Problem.population.best()
+            report.append(cost)
+        if checkpoint and (gen + 1) % job.get('checkpoint_every', 1000) == 0:
+            if writer is not None:
+                writer.flush(wait=True)
+            temp.save(checkpoint, log=np.array(log, dtype=str), report=np.array(report, dtype=np.float64),
+                      seconds=time.perf_counter() - start, best_cost=temp.best_cost,
+                      best_generation=temp.best_generation)
+    if writer is not None:
+        writer.close()
+    route, cost = Problem.population.best()
+    result = {'log': log, 'report': report, 'cost': cost, 'seconds': time.perf_counter() - start,
+              'generations': temp.generation, 'stop_reason': temp.stop_reason}
+    if job.get('result'):
+        temporary = job['result'] + '.tmp'
+        with open(temporary, 'w') as output:
+            json.dump(result, output)
+        os.replace(temporary, job['result'])
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return result
+
+
+def job_label(job: dict) -> str:
+    return job['filename'] + ' algorithm:' + algorithm_name(job['algorithm']) + ' size:' + str(job['size'])
+
+
+def job_checksum(job: dict) -> int:
+    """
+    A checksum of everything in a job which changes its result, i.e. all
+    but the files it writes to. The files of resumable carry it, so a job
+    with other settings does not pick up the result or checkpoint of an
+    earlier one.
+    """
+    settings = {key: value for key, value in job.items() if key not in ('result', 'checkpoint', 'checkpoint_every')}
+    settings['snapshots'] = bool(job.get('snapshots'))
+    return zlib.crc32(json.dumps(settings, sort_keys=True).encode())
+
+
+def job_file(directory: str, job: dict, repeat: int = None, extension: str = '.snap') -> str:
+    name = '%s/%s-%s-%d' % (directory, job['filename'], algorithm_name(job['algorithm']), job['size'])
+    return name + ('' if repeat is None else '-%d' % repeat) + extension
+
+
+def resumable(jobs: list, directory: str, repeat: int = None) -> None:
+    """
+    Give every job a checkpoint and a result file in directory, so a sweep
+    which is run again skips the finished jobs and resumes the others. The
+    files are named after job_checksum, a sweep with another seed or
+    number of generations gets its own.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for i, job in enumerate(jobs):
+        r = None if repeat is None else i % repeat
+        checksum = '-%08x' % job_checksum(job)
+        job['checkpoint'] = job_file(directory, job, r, checksum + '.checkpoint.npz')
+        job['result'] = job_file(directory, job, r, checksum + '.json')
+
+
+def run_jobs(jobs: list, workers: int = None):
+    """
+    Run independent jobs on a process pool.
+    :param jobs: the jobs, see run_job
+    :param workers: the number of processes, all the cores by default
+    :return: an iterator over the results, in the order of jobs
+    """
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for result in executor.map(run_job, jobs):
+            yield result
+
+
+def run_test1(workers: int = None, seed: int = 0, sizes=(10, 20, 50, 100),
+              algorithms=([3, 1, 1], [3, 1, 2], [3, 2, 1]), generation: int = 20000, binary: bool = False,
+              resume: bool = False):
+    """
+    Run the sweep of test1.py in parallel and write test1/test1.txt and
+    test1/<instance>.txt in the same layout. With binary the routes are
+    logged to one test1/<instance>-<algorithm>-<size>.snap file per job
+    instead, ResultLog.to_text turns them back into text. With resume the
+    jobs keep checkpoints and results in test1/jobs, see resumable.
+    """
+    jobs = [{'filename': filename, 'size': size, 'algorithm': algorithm, 'generations': generation,
+             'seed': job_seed(seed, filename, size, algorithm, 0), 'log_every': 100,
+             'report': (5000, 10000, 20000)}
+            for filename in filenames for size in sizes for algorithm in algorithms]
+    if binary:
+        for job in jobs:
+            job['snapshots'] = job_file('test1', job)
+    if resume:
+        resumable(jobs, 'test1/jobs')
+
+    test1 = open('test1/test1.txt', 'w')
+    log = None
+    for job, result in zip(jobs, run_jobs(jobs, workers)):
+        if log is None or log.name != 'test1/' + job['filename'] + '.txt':
+            if log is not None:
+                log.close()
+            log = open('test1/' + job['filename'] + '.txt', 'w')
+        header = job_label(job)
+        test1.write(header + '\n')
+        log.write(header + '\n')
+        for solution in result['log']:
+            log.write(solution + '\n')
+        for cost in result['report']:
+            test1.write(str(cost) + ' ')
+        if generation >= 20000:
+            log.write('\r\n')
+        test1.write('\r\n')
+        log.write('\r\n')
+        log.flush()
+        test1.flush()
+    if log is not None:
+        log.close()
+    test1.close()
+
+
+def run_test2(workers: int = None, seed: int = 0, size: int = 50, algorithm=(3, 1, 1),
+              generation: int = 10000, repeat: int = 10, binary: bool = False, resume: bool = False):
+    """
+    Run the repeats of test2.py in parallel and write test2/test2.txt and
+    test2/<instance>.txt in the same layout, see run_test1 for binary and resume.
+    """
+    algorithm = list(algorithm)
+    jobs = [{'filename': filename, 'size': size, 'algorithm': algorithm, 'generations': generation,
+             'seed': job_seed(seed, filename, size, algorithm, r), 'log_every': 1000, 'report': ()}
+            for filename in filenames for r in range(repeat)]
+    if binary:
+        for i, job in enumerate(jobs):
+            job['snapshots'] = job_file('test2', job, i % repeat)
+    if resume:
+        resumable(jobs, 'test2/jobs', repeat)
+    results = run_jobs(jobs, workers)
+
+    test2 = open('test2/test2.txt', 'w')
+    for filename in filenames:
+        header = filename + ' algorithm:' + algorithm_name(algorithm) + ' size:' + str(size)
+        log = open('test2/' + filename + '.txt', 'w')
+        test2.write(header)
+        log.write(header + '\n')
+        cost_list = []
+        for r in range(repeat):
+            result = next(results)
+            for solution in result['log']:
+                log.write(solution + '\n')
+            cost_list.append(result['cost'])
+        test2.write(filename + ' average cost:' + str(np.mean(cost_list)) +
+                    ' standard deviation:' + str(np.std(cost_list, ddof=1)))
+        test2.write('\n')
+        test2.flush()
+        log.close()
+    test2.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the test1/test2 sweeps on a process pool')
+    parser.add_argument('test', choices=['test1', 'test2'])
+    parser.add_argument('--workers', type=int, default=None, help='number of processes, all the cores by default')
+    parser.add_argument('--seed', type=int, default=0, help='base seed, every job derives its own seed from it')
+    parser.add_argument('--binary', action='store_true', help='log the routes as binary snapshots')
+    parser.add_argument('--resume', action='store_true',
+                        help='checkpoint the jobs, skip the finished ones and resume the others')
+    args = parser.parse_args()
+    if args.test == 'test1':
+        run_test1(args.workers, args.seed, binary=args.binary, resume=args.resume)
+    else:
+        run_test2(args.workers, args.seed, binary=args.binary, resume=args.resume)
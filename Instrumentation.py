@@ -0,0 +1,82 @@
+import csv
+import json
+import time
+from contextlib import nullcontext
+
+# the context returned by timer when there is no profiler, entering it costs next to nothing
+disabled = nullcontext()
+
+
+class Timer:
+    def __init__(self, profiler, key):
+        self.profiler = profiler
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.profiler.add(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    def __init__(self):
+        """
+        Initial a profiler. It keeps the cumulative time and the number of
+        calls of every (operator, method id), and the per-generation events
+        when it is registered as a hook with EvolutionaryAlgorithm.add_hook.
+        """
+        self.seconds = {}
+        self.calls = {}
+        self.events = []
+
+    def timer(self, operator: str, method=None) -> Timer:
+        """
+        :return: a context which adds its duration to (operator, method)
+        """
+        return Timer(self, (operator, method))
+
+    def add(self, key, seconds: float) -> None:
+        self.seconds[key] = self.seconds.get(key, 0.) + seconds
+        self.calls[key] = self.calls.get(key, 0) + 1
+
+    def __call__(self, event: dict) -> None:
+        self.events.append(dict(event))
+
+    def rows(self) -> list:
+        """
+        :return: one dict per (operator, method) with its calls, total and mean time
+        """
+        return [{'operator': operator, 'method': '' if method is None else method, 'calls': self.calls[key],
+                 'seconds': self.seconds[key], 'mean': self.seconds[key] / self.calls[key]}
+                for key in sorted(self.seconds, key=lambda k: (k[0], str(k[1])))
+                for operator, method in [key]]
+
+    def to_csv(self, file_name: str, events: bool = False) -> None:
+        """
+        Write the timers, or the per-generation events, as a CSV file.
+        """
+        rows = self.events if events else self.rows()
+        fields = list(rows[0]) if rows else ['operator', 'method', 'calls', 'seconds', 'mean']
+        with open(file_name, 'w', newline='') as output:
+            writer = csv.DictWriter(output, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def to_json(self, file_name: str) -> None:
+        """
+        Write the timers and the per-generation events as a JSON file.
+        """
+        with open(file_name, 'w') as output:
+            json.dump({'timers': self.rows(), 'generations': self.events}, output, indent=1)
+
+
+def timer(profiler: Profiler, operator: str, method=None):
+    """
+    Time a block with a profiler which may be None.
+    """
+    if profiler is None:
+        return disabled
+    return profiler.timer(operator, method)
@@ -0,0 +1,112 @@
+import multiprocessing
+import numpy as np
+from TSPProblem import TSPProblem
+from EvolutionaryAlgorithm import EvolutionaryAlgorithm
+
+
+def island(index: int, file_name: str, size: int, algorithm, generations: int, interval: int, migrants: int,
+           seed: int, batched: bool, inbox, in_degree: int, outboxes: list, results) -> None:
+    """
+    Evolve one island in a worker process. Every interval generations the
+    best routes are sent to the neighbour islands as an int32 array, tagged
+    with the generation and the sender, and the migrants received replace
+    the worst individuals.
+    :param index: the number of the island
+    :param seed: the np.random.SeedSequence of the island's RandomStream
+    :param inbox: the queue the neighbours send their migrants to
+    :param in_degree: the number of islands which send to this one
+    :param outboxes: the queues of the neighbours
+    :param results: the queue the best route is reported to at the end
+    """
+    Problem = TSPProblem(file_name, size, seed=seed)
+    temp = EvolutionaryAlgorithm(Problem, algorithm, batched)
+    # the migrants of a later migration which came before those of the current one
+    early = {}
+    for gen in range(generations):
+        temp.run()
+        if (gen + 1) % interval == 0:
+            costs = Problem.population.route_distances()
+            best = np.argsort(costs)[:migrants]
+            for outbox in outboxes:
+                outbox.put((gen + 1, index, Problem.population.routes[best], costs[best]))
+            messages = early.pop(gen + 1, [])
+            while len(messages) < in_degree:
+                message = inbox.get()
+                if message[0] == gen + 1:
+                    messages.append(message)
+                else:
+                    early.setdefault(message[0], []).append(message)
+            # immigrate in the order of the senders, not of arrival, so the run only depends on the seed
+            for _, _, routes, route_costs in sorted(messages, key=lambda message: message[1]):
+                Problem.population.immigrate(routes, route_costs)
+            Problem.update_fitness()
+    solution, cost = Problem.population.findLeastCost()
+    results.put((index, solution, cost))
+
+
+class IslandModel:
+    def __init__(self, file_name: str, algorithms: list, size: int = 50, interval: int = 50, migrants: int = 2,
+                 topology: str = 'ring', seed: int = 0, batched: bool = False):
+        """
+        Initial an island model. Every island is a population evolved by its
+        own EvolutionaryAlgorithm in a separate process.
+        :param file_name: the .tsp file
+        :param algorithms: one [selection, crossover, mutation] per island
+        :param size: the population size of each island
+        :param interval: the number of generations between two migrations
+        :param migrants: how many of its best routes an island sends
+        :param topology: 'ring' (island i sends to island i + 1) or 'full'
+        (every island sends to all the others)
+        :param seed: the seed the islands derive their own seeds from
+        :param batched: whether the islands use the batched operators
+        """
+        if topology not in ('ring', 'full'):
+            raise ValueError("Value is not permitted")
+        self.file_name = file_name
+        self.algorithms = algorithms
+        self.size = size
+        self.interval = interval
+        self.migrants = migrants
+        self.topology = topology
+        self.seed = seed
+        self.batched = batched
+
+    def neighbours(self, index: int) -> list:
+        """
+        :return: the islands which island index sends its migrants to
+        """
+        number = len(self.algorithms)
+        if self.topology == 'ring':
+            return [(index + 1) % number]
+        return [i for i in range(number) if i != index]
+
+    def run(self, generations: int) -> list:
+        """
+        Evolve all the islands for a number of generations.
+        :return: a list of (solution, cost) of every island, solution is the
+        city sequence as written by Population.findLeastCost
+        """
+        number = len(self.algorithms)
+        seeds = np.random.SeedSequence(self.seed).spawn(number)
+        inboxes = [multiprocessing.Queue() for _ in range(number)]
+        results = multiprocessing.Queue()
+        in_degrees = [0] * number
+        for i in range(number):
+            for j in self.neighbours(i):
+                in_degrees[j] += 1
+
+        processes = []
+        for i in range(number):
+            outboxes = [inboxes[j] for j in self.neighbours(i)]
+            processes.append(multiprocessing.Process(target=island, args=(
+                i, self.file_name, self.size, self.algorithms[i], generations, self.interval, self.migrants,
+                seeds[i], self.batched, inboxes[i], in_degrees[i], outboxes, results)))
+        for process in processes:
+            process.start()
+        best = [None] * number
+        for _ in range(number):
+            index, solution, cost = results.get()
+            best[index] = (solution, cost)
+        for process in processes:
+            process.join()
+        return best
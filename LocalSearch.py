@@ -0,0 +1,181 @@
+import time
+from collections import deque
+import numpy as np
+from TSPProblem import DistanceMatrix, Individual
+from CandidateList import CandidateList
+
+
+class LocalSearch:
+    def __init__(self, distance: DistanceMatrix, moves: int = None, seconds: float = None, neighbours: int = 8,
+                 or_opt: bool = True):
+        """
+        Initial a 2-opt and Or-opt local search. A move is only tried between
+        a city and its nearest neighbours, and cities whose surroundings did
+        not change are skipped (don't-look bits). Every move is evaluated
+        from the edges it replaces.
+        :param distance: the distance matrix of the problem, its candidate
+        list is used and built with the given number of neighbours if missing
+        :param moves: the number of improving moves allowed per generation
+        :param seconds: the time allowed per generation
+        :param neighbours: the number of neighbours if a candidate list is built
+        :param or_opt: whether to try Or-opt moves as well as 2-opt moves
+        """
+        if distance.candidates is None:
+            distance.candidates = CandidateList(distance.coordinates, neighbours)
+        self.distance = distance
+        self.neighbours = distance.candidates.neighbours.tolist()
+        # neighbour_distance[a][i] is the distance between a and its i-th neighbour
+        self.neighbour_distance = distance.pairs(np.arange(distance.n)[:, None],
+                                                 distance.candidates.neighbours).tolist()
+        self.moves = moves
+        self.seconds = seconds
+        self.or_opt = or_opt
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Start the budget of a new generation.
+        """
+        self.moves_left = self.moves if self.moves is not None else float('inf')
+        self.deadline = time.perf_counter() + self.seconds if self.seconds is not None else float('inf')
+
+    def exhausted(self) -> bool:
+        return self.moves_left <= 0 or time.perf_counter() > self.deadline
+
+    def improve(self, individual: Individual) -> float:
+        """
+        Improve a route in place until no move helps or the budget is spent.
+        :param individual: the individual, its cached route length is updated
+        :return: the change of the route length
+        """
+        if self.exhausted():
+            return 0.
+        self.route = individual.route.tolist()
+        self.n = len(self.route)
+        self.position = [0] * self.n
+        for i, city in enumerate(self.route):
+            self.position[city] = i
+        queue = deque(self.route)
+        queued = [True] * self.n
+
+        delta = 0.
+        while queue and not self.exhausted():
+            a = queue.popleft()
+            queued[a] = False
+            gain, touched = self.two_opt(a)
+            if gain <= 1e-10 and self.or_opt:
+                gain, touched = self.or_move(a)
+            if gain > 1e-10:
+                delta -= gain
+                self.moves_left -= 1
+                for city in touched:
+                    if not queued[city]:
+                        queued[city] = True
+                        queue.append(city)
+
+        if delta:
+            individual.route[:] = self.route
+        individual.cost = None if individual.cost is None else individual.cost + delta
+        return delta
+
+    def succ(self, city: int) -> int:
+        return self.route[(self.position[city] + 1) % self.n]
+
+    def pred(self, city: int) -> int:
+        return self.route[self.position[city] - 1]
+
+    def reverse(self, first: int, second: int) -> None:
+        """
+        Reverse the route from position first to position second (both
+        included, wrapping around the end). The shorter of the segment and
+        the rest of the route is reversed, both give the same tour.
+        """
+        route, position, n = self.route, self.position, self.n
+        length = (second - first) % n + 1
+        if 2 * length > n:
+            first, length = (second + 1) % n, n - length
+        i, j = first, (first + length - 1) % n
+        for _ in range(length // 2):
+            route[i], route[j] = route[j], route[i]
+            position[route[i]] = i
+            position[route[j]] = j
+            i = (i + 1) % n
+            j = (j - 1) % n
+
+    def two_opt(self, a: int) -> (float, list):
+        """
+        Try to replace an edge of city a and another edge by two edges, one
+        of which joins a and a neighbour c. The first improving move is taken.
+        :return: a tuple which represents (gain, the cities whose edges changed)
+        """
+        distance = self.distance.distance
+        for forward in (True, False):
+            b = self.succ(a) if forward else self.pred(a)
+            d_ab = distance(a, b)
+            for c, d_ac in zip(self.neighbours[a], self.neighbour_distance[a]):
+                g1 = d_ab - d_ac
+                if g1 <= 0:
+                    break
+                d = self.succ(c) if forward else self.pred(c)
+                if d == a:
+                    continue
+                gain = g1 + distance(c, d) - distance(b, d)
+                if gain > 1e-10:
+                    if forward:
+                        # a b ... c d -> a c ... b d
+                        self.reverse(self.position[b], self.position[c])
+                    else:
+                        # d c ... b a -> d b ... c a
+                        self.reverse(self.position[c], self.position[b])
+                    return gain, [a, b, c, d]
+        return 0., []
+
+    def or_move(self, a: int) -> (float, list):
+        """
+        Try to move the segment of 1 to 3 cities starting at city a between a
+        neighbour c and its successor or predecessor, in either direction.
+        :return: a tuple which represents (gain, the cities whose edges changed)
+        """
+        distance = self.distance.distance
+        for length in (1, 2, 3):
+            if length + 2 >= self.n:
+                break
+            start = self.position[a]
+            segment = [self.route[(start + i) % self.n] for i in range(length)]
+            s1, s2 = segment[0], segment[-1]
+            p, q = self.pred(s1), self.succ(s2)
+            removed = distance(p, s1) + distance(s2, q) - distance(p, q)
+            for end in (s1, s2):
+                for c, d_ec in zip(self.neighbours[end], self.neighbour_distance[end]):
+                    if removed - d_ec <= 0:
+                        break
+                    if c in segment:
+                        continue
+                    for d in (self.succ(c), self.pred(c)):
+                        if d in segment:
+                            continue
+                        # c and d become the neighbours of end and of the other end of the segment
+                        other = s2 if end == s1 else s1
+                        gain = removed + distance(c, d) - d_ec - distance(other, d)
+                        if gain > 1e-10:
+                            self.insert(segment, c, d, end)
+                            return gain, [p, q, c, d, s1, s2]
+        return 0., []
+
+    def insert(self, segment: list, c: int, d: int, end: int) -> None:
+        """
+        Move a segment between the adjacent cities c and d, so that end is
+        next to c.
+        """
+        start = self.position[segment[0]]
+        rest = (self.route[start:] + self.route[:start])[len(segment):]
+        at = rest.index(c)
+        after_c = rest[(at + 1) % len(rest)] == d
+        # the segment read from the city next to c to the city next to d
+        block = segment if end == segment[0] else segment[::-1]
+        if after_c:
+            self.route = rest[:at + 1] + block + rest[at + 1:]
+        else:
+            self.route = rest[:at] + block[::-1] + rest[at:]
+        for i, city in enumerate(self.route):
+            self.position[city] = i
@@ -0,0 +1,103 @@
+import numpy as np
+
+
+class RandomStream:
+    def __init__(self, seed=None, buffer_size: int = 4096):
+        """
+        Initial the random numbers of one run, a numpy Generator. The scalar
+        draws of the operators are served from a buffer of uniform numbers
+        which is refilled in bulk, so a draw is a list lookup instead of a
+        call into the generator. Array draws go to self.generator directly.
+        :param seed: an int, a np.random.SeedSequence (e.g. one of spawn) or
+        None for fresh entropy. The same seed gives the same run.
+        :param buffer_size: the number of uniform numbers drawn at once
+        """
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        self.generator = np.random.Generator(np.random.PCG64(seed))
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.index = 0
+
+    def refill(self, size: int = None) -> None:
+        """
+        Pre-draw the next size (buffer_size by default) uniform numbers.
+        """
+        self.buffer = self.buffer[self.index:] + self.generator.random(size or self.buffer_size).tolist()
+        self.index = 0
+
+    def random(self) -> float:
+        """
+        :return: a uniform number in [0, 1)
+        """
+        if self.index == len(self.buffer):
+            self.refill()
+        value = self.buffer[self.index]
+        self.index += 1
+        return value
+
+    def randrange(self, stop: int) -> int:
+        """
+        :return: an integer in [0, stop)
+        """
+        return int(self.random() * stop)
+
+    def randint(self, a: int, b: int) -> int:
+        """
+        :return: an integer in [a, b], both included as in random.randint
+        """
+        return a + self.randrange(b - a + 1)
+
+    def choice(self, sequence):
+        return sequence[self.randrange(len(sequence))]
+
+    def sample(self, n: int, k: int) -> list:
+        """
+        Draw k different integers below n.
+        """
+        if k > 4:
+            return self.generator.choice(n, k, replace=False).tolist()
+        drawn = []
+        for j in range(k):
+            value = self.randrange(n - j)
+            # move past the integers already drawn, from the smallest on
+            for taken in sorted(drawn):
+                if value >= taken:
+                    value += 1
+            drawn.append(value)
+        return drawn
+
+    def pairs(self, n: int, count: int) -> (np.ndarray, np.ndarray):
+        """
+        Draw count pairs of different integers below n at once.
+        :return: a tuple which represents (first integers, second integers)
+        """
+        first = self.generator.integers(n, size=count)
+        second = (first + self.generator.integers(1, n, size=count)) % n
+        return first, second
+
+    def spawn(self, number: int) -> list:
+        """
+        :return: number independent streams, e.g. one per worker process
+        """
+        return [RandomStream(seed, self.buffer_size) for seed in self.seed_sequence.spawn(number)]
+
+    def get_state(self) -> dict:
+        """
+        :return: the state of the generator and the numbers left in the buffer
+        """
+        return {'generator': self.generator.bit_generator.state, 'buffer': self.buffer[self.index:]}
+
+    def set_state(self, state: dict) -> None:
+        self.generator.bit_generator.state = state['generator']
+        self.buffer = list(state['buffer'])
+        self.index = 0
+
+
+# the stream of the operators which are called without one
+default = RandomStream()
+
+
+def stream(rng: RandomStream = None) -> RandomStream:
+    return default if rng is None else rng
@@ -0,0 +1,142 @@
+import heapq
+import numpy as np
+
+
+class CostHeap:
+    def __init__(self, costs):
+        """
+        Keep the route lengths of a population in a min-heap and a max-heap,
+        so the best and the worst individual are found in O(log n). An
+        update pushes a new entry and bumps the version of the individual,
+        older entries are dropped lazily when they come to the top. Equal
+        route lengths are ordered by index, so the heap picks the same
+        individuals whatever the order of the updates was.
+        :param costs: the route length of every individual
+        """
+        self.costs = [float(cost) for cost in costs]
+        self.version = [0] * len(self.costs)
+        self.low = [(cost, i, 0) for i, cost in enumerate(self.costs)]
+        self.high = [(-cost, i, 0) for i, cost in enumerate(self.costs)]
+        heapq.heapify(self.low)
+        heapq.heapify(self.high)
+
+    def __len__(self):
+        return len(self.costs)
+
+    def update(self, index: int, cost: float) -> None:
+        self.costs[index] = cost
+        self.version[index] += 1
+        heapq.heappush(self.low, (cost, index, self.version[index]))
+        heapq.heappush(self.high, (-cost, index, self.version[index]))
+        if len(self.low) > 4 * len(self.costs):
+            self.__init__(self.costs)
+
+    def top(self, heap: list) -> tuple:
+        while heap[0][2] != self.version[heap[0][1]]:
+            heapq.heappop(heap)
+        return heap[0]
+
+    def best(self) -> (int, float):
+        """
+        :return: a tuple which represents (index, route length) of the shortest route
+        """
+        cost, index, version = self.top(self.low)
+        return index, cost
+
+    def worst(self) -> (int, float):
+        """
+        :return: a tuple which represents (index, route length) of the longest route
+        """
+        cost, index, version = self.top(self.high)
+        return index, -cost
+
+    def pop(self, heap: list, k: int) -> list:
+        indices = []
+        for _ in range(k):
+            indices.append(self.top(heap)[1])
+            heapq.heappop(heap)
+        return indices
+
+    def pop_best(self, k: int) -> list:
+        """
+        Take the k shortest routes off the heap, they have to be updated
+        or the heap rebuilt afterwards.
+        :return: their indices
+        """
+        return self.pop(self.low, k)
+
+    def pop_worst(self, k: int) -> list:
+        """
+        Take the k longest routes off the heap, see pop_best.
+        """
+        return self.pop(self.high, k)
+
+
+def steady_state(population, routes: np.ndarray, costs: np.ndarray) -> None:
+    """
+    Replace the worst len(routes) individuals by the offspring, in place.
+    The best individual survives as long as there are fewer offspring
+    than individuals.
+    :param population: the Population
+    :param routes: an (m, n) array of offspring routes
+    :param costs: their route lengths
+    """
+    heap = population.cost_heap()
+    for index, route, cost in zip(heap.pop_worst(min(len(routes), len(heap))), routes, costs.tolist()):
+        population.replace(index, route, cost)
+
+
+def plus(population, routes: np.ndarray, costs: np.ndarray) -> None:
+    """
+    (mu + lambda) replacement: keep the best individuals of the population
+    and the offspring. Every offspring shorter than the current worst
+    individual takes its place, from the shortest offspring on.
+    """
+    heap = population.cost_heap()
+    for i in np.argsort(costs, kind='stable').tolist():
+        index, worst = heap.worst()
+        if costs[i] >= worst:
+            break
+        population.replace(index, routes[i], float(costs[i]))
+
+
+def comma(population, routes: np.ndarray, costs: np.ndarray, elites: int = 1) -> None:
+    """
+    (mu, lambda) replacement with elitism: the best elites individuals are
+    kept and the others are replaced by the best offspring.
+    :param elites: the number of individuals which survive
+    """
+    heap = population.cost_heap()
+    kept = set(heap.pop_best(min(elites, len(heap))))
+    replaced = [index for index in range(len(heap)) if index not in kept]
+    # nearly every row is written, the heap and the tour hashes are cheaper to build again in one go
+    population.heap = None
+    population.row_hashes = None
+    if len(routes) < len(replaced):
+        raise ValueError("(mu, lambda) replacement needs at least %d offspring" % len(replaced))
+    chosen = np.argpartition(costs, len(replaced) - 1)[:len(replaced)] if replaced else []
+    for index, i in zip(replaced, chosen):
+        population.replace(index, routes[i], float(costs[i]))
+
+
+def replace(replacement_method: int, population, routes: np.ndarray, costs: np.ndarray, elites: int = 1) -> None:
+    """
+    Put the offspring of a generation into the population.
+    :param replacement_method: this parameter represents a replacement method.
+    This is the mapping chart:
+
+    replacement_method | real_method
+    2 -> steady-state, the worst individuals are replaced
+    3 -> (mu + lambda)
+    4 -> (mu, lambda) with elitism
+
+    1, the generational replacement, is done by Population.change
+    """
+    if replacement_method == 2:
+        steady_state(population, routes, costs)
+    elif replacement_method == 3:
+        plus(population, routes, costs)
+    elif replacement_method == 4:
+        comma(population, routes, costs, elites)
+    else:
+        raise ValueError("Value is not permitted")
@@ -0,0 +1,159 @@
+import os
+import queue
+import struct
+import threading
+import numpy as np
+
+magic = b'TSPSNAP1'
+
+
+def record_dtype(n: int) -> np.dtype:
+    """
+    The layout of one snapshot: the generation, the cost and the route, as
+    int16 when the city indices fit and int32 otherwise.
+    """
+    route = np.int16 if n <= np.iinfo(np.int16).max else np.int32
+    return np.dtype([('generation', '<i8'), ('cost', '<f8'), ('route', route, (n,))])
+
+
+class SnapshotWriter:
+    def __init__(self, file_name: str, ids, label: str = '', buffer_size: int = 64, resume: int = None):
+        """
+        Open an append-only log of the incumbent route. Snapshots are kept in
+        a buffer and a background thread appends full buffers to the file,
+        so the GA does not wait for the disk.
+        :param file_name: the log file, it is overwritten
+        :param ids: the city numbers of the TSPLIB file, route index i is city ids[i]
+        :param label: a line describing the run, e.g. the header line of test1
+        :param buffer_size: the number of snapshots written at once
+        :param resume: continue a log from this generation on: the existing
+        snapshots of earlier generations are kept and the later ones dropped,
+        as when a run is resumed from a checkpoint
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        self.dtype = record_dtype(len(ids))
+        self.buffer = np.zeros(buffer_size, dtype=self.dtype)
+        self.count = 0
+        if resume is not None and os.path.exists(file_name):
+            offset, snapshots = header_size(file_name), read_snapshots(file_name)[2]
+            kept = int(np.count_nonzero(snapshots['generation'] < resume))
+            del snapshots
+            self.file = open(file_name, 'r+b')
+            self.file.truncate(offset + kept * self.dtype.itemsize)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(file_name, 'wb')
+            label = label.encode()
+            self.file.write(magic + struct.pack('<III', len(ids), self.dtype['route'].base.itemsize, len(label)))
+            self.file.write(label)
+            self.file.write(ids.tobytes())
+        # the exception the writing thread stopped writing on, raised by flush and close
+        self.error = None
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.drain, daemon=True)
+        self.thread.start()
+
+    def drain(self) -> None:
+        while True:
+            block = self.queue.get()
+            try:
+                if block is None:
+                    break
+                # after a failed write the blocks are only taken, so flush(wait=True) does not wait forever
+                if self.error is None:
+                    self.file.write(block.tobytes())
+                    self.file.flush()
+            except Exception as error:
+                self.error = error
+            finally:
+                self.queue.task_done()
+
+    def raise_error(self) -> None:
+        """
+        Raise the exception the writing thread failed on, e.g. a full disk.
+        """
+        if self.error is not None:
+            raise self.error
+
+    def write(self, generation: int, route: np.ndarray, cost: float) -> None:
+        """
+        Add a snapshot of the incumbent.
+        """
+        self.buffer[self.count] = (generation, cost, route)
+        self.count += 1
+        if self.count == len(self.buffer):
+            self.flush()
+
+    def flush(self, wait: bool = False) -> None:
+        """
+        Hand the buffered snapshots to the writing thread.
+        :param wait: wait until they are in the file, e.g. before a checkpoint
+        """
+        if self.count:
+            self.queue.put(self.buffer[:self.count].copy())
+            self.count = 0
+        if wait:
+            self.queue.join()
+        self.raise_error()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self.queue.put(None)
+            self.thread.join()
+            self.file.close()
+        self.raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+        return False
+
+
+def header_size(file_name: str) -> int:
+    with open(file_name, 'rb') as log:
+        log.seek(len(magic))
+        n, itemsize, length = struct.unpack('<III', log.read(12))
+    return len(magic) + 12 + length + 8 * n
+
+
+def read_snapshots(file_name: str):
+    """
+    Read a log written by SnapshotWriter. The snapshots are memory-mapped.
+    :return: a tuple which represents (label, ids, snapshots), snapshots is a
+    structured array with the fields generation, cost and route
+    """
+    with open(file_name, 'rb') as log:
+        if log.read(len(magic)) != magic:
+            raise ValueError("%s is not a snapshot log" % file_name)
+        n, itemsize, length = struct.unpack('<III', log.read(12))
+        label = log.read(length).decode()
+        ids = np.frombuffer(log.read(8 * n), dtype=np.int64)
+        offset = log.tell()
+    dtype = record_dtype(n)
+    if dtype['route'].base.itemsize != itemsize:
+        raise ValueError("%s has an unknown route type" % file_name)
+    count = (len(np.memmap(file_name, dtype=np.uint8, mode='r')) - offset) // dtype.itemsize
+    if count == 0:
+        return label, ids, np.zeros(0, dtype=dtype)
+    return label, ids, np.memmap(file_name, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def to_text(file_name: str) -> str:
+    """
+    Turn a snapshot log into the text the test scripts write: the label line
+    and then one line of space separated city numbers per snapshot.
+    """
+    label, ids, snapshots = read_snapshots(file_name)
+    lines = [label] + [' '.join(map(str, ids[route].tolist())) for route in snapshots['route']]
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    import sys
+
+    for name in sys.argv[1:]:
+        sys.stdout.write(to_text(name))
@@ -0,0 +1,181 @@
+import numpy as np
+from CandidateList import CandidateList
+from RandomStream import RandomStream, stream
+
+
+def candidate_list(distance) -> CandidateList:
+    """
+    Get the candidate list of a DistanceMatrix, building one if it has none.
+    """
+    if distance.candidates is None:
+        distance.candidates = CandidateList(distance.coordinates)
+    return distance.candidates
+
+
+def nearest_neighbour_tour(distance, start: int = 0) -> np.ndarray:
+    """
+    Build a tour which always goes on to the nearest unvisited city. The
+    candidate list is looked at first, only when all the neighbours of a
+    city have been visited are the distances to all unvisited cities computed.
+    :param distance: the DistanceMatrix of the problem
+    :param start: the first city
+    :return: the tour as an int32 array
+    """
+    neighbours = candidate_list(distance).neighbours.tolist()
+    n = distance.n
+    visited = np.zeros(n, dtype=bool)
+    # the unvisited cities are unvisited[:left], rebuilt from visited when a full scan is needed
+    unvisited = np.arange(n)
+    tour = [start]
+    visited[start] = True
+    current = start
+    for _ in range(n - 1):
+        for city in neighbours[current]:
+            if not visited[city]:
+                current = city
+                break
+        else:
+            unvisited = unvisited[~visited[unvisited]]
+            current = int(unvisited[np.argmin(distance.pairs(current, unvisited))])
+        visited[current] = True
+        tour.append(current)
+    return np.array(tour, dtype=np.int32)
+
+
+def greedy_edge_tour(distance) -> np.ndarray:
+    """
+    Build a tour by the greedy edge matching: the candidate edges are taken
+    from the shortest on, unless they would give a city three edges or close
+    a cycle. The fragments left are joined by going from the end of one to
+    the nearest end of another.
+    :param distance: the DistanceMatrix of the problem
+    :return: the tour as an int32 array
+    """
+    candidates = candidate_list(distance)
+    n = distance.n
+    first = np.repeat(np.arange(n), candidates.k)
+    second = candidates.neighbours.ravel()
+    keep = first < second
+    first, second = first[keep], second[keep]
+    order = np.argsort(distance.pairs(first, second), kind='stable')
+
+    parent = list(range(n))
+
+    def root(city):
+        while parent[city] != city:
+            parent[city] = parent[parent[city]]
+            city = parent[city]
+        return city
+
+    adjacent = [[] for _ in range(n)]
+    for a, b in zip(first[order].tolist(), second[order].tolist()):
+        if len(adjacent[a]) < 2 and len(adjacent[b]) < 2:
+            root_a, root_b = root(a), root(b)
+            if root_a != root_b:
+                parent[root_a] = root_b
+                adjacent[a].append(b)
+                adjacent[b].append(a)
+
+    # the ends of the fragments, a city without edges is a fragment on its own
+    ends = np.array([city for city in range(n) if len(adjacent[city]) < 2])
+    free = np.ones(len(ends), dtype=bool)
+    index_of_end = {city: i for i, city in enumerate(ends.tolist())}
+    visited = np.zeros(n, dtype=bool)
+    tour = []
+    current = int(ends[0])
+    while True:
+        # walk along the fragment from one end to the other
+        previous = -1
+        free[index_of_end[current]] = False
+        while True:
+            tour.append(current)
+            visited[current] = True
+            following = [city for city in adjacent[current] if city != previous and not visited[city]]
+            if not following:
+                break
+            previous, current = current, following[0]
+        free[index_of_end[current]] = False
+        if not free.any():
+            break
+        left = np.flatnonzero(free)
+        current = int(ends[left[np.argmin(distance.pairs(current, ends[left]))]])
+    return np.array(tour, dtype=np.int32)
+
+
+def space_filling_curve_tour(coordinates, order: int = 16) -> np.ndarray:
+    """
+    Build a tour which visits the cities in the order of a Hilbert curve
+    over the bounding box of the coordinates.
+    :param coordinates: an (n, 2) array of the city coordinates
+    :param order: the curve runs over a 2^order * 2^order grid
+    :return: the tour as an int32 array
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    low = coordinates.min(axis=0)
+    span = float((coordinates.max(axis=0) - low).max()) or 1.
+    side = 1 << order
+    grid = np.minimum(((coordinates - low) / span * side).astype(np.int64), side - 1)
+    x, y = grid[:, 0].copy(), grid[:, 1].copy()
+    index = np.zeros(len(coordinates), dtype=np.int64)
+    s = side // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        index += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # rotate the quadrant so the curve stays continuous
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+        s //= 2
+    return np.argsort(index, kind='stable').astype(np.int32)
+
+
+def double_bridge(tour: np.ndarray, rng: RandomStream = None) -> np.ndarray:
+    """
+    Cut a tour into four parts A B C D and join them as A C B D. This
+    changes four edges, which 2-opt and Or-opt moves can not easily undo.
+    :param tour: the tour
+    :param rng: the RandomStream of the run
+    :return: the perturbed tour
+    """
+    if len(tour) < 8:
+        return tour.copy()
+    first, second, third = sorted(1 + value for value in stream(rng).sample(len(tour) - 1, 3))
+    return np.concatenate((tour[:first], tour[second:third], tour[first:second], tour[third:]))
+
+
+def seeded_tours(distance, number: int, methods=('nearest', 'greedy', 'curve'), perturbation: int = 1,
+                 rng: RandomStream = None) -> list:
+    """
+    Build tours with the constructive heuristics, cycling through the methods.
+    The nearest neighbour tours start from different random cities, and all
+    but the first tour of every method are perturbed by double bridges so
+    the seeded individuals are not copies of each other.
+    :param distance: the DistanceMatrix of the problem
+    :param number: the number of tours
+    :param methods: any of 'nearest', 'greedy' and 'curve'
+    :param perturbation: the number of double bridges per perturbed tour
+    :param rng: the RandomStream of the run
+    :return: a list of int32 tours
+    """
+    rng = stream(rng)
+    constructions = {}
+    tours = []
+    for i in range(number):
+        method = methods[i % len(methods)]
+        if method == 'nearest':
+            tour = nearest_neighbour_tour(distance, rng.randrange(distance.n))
+        elif method in constructions:
+            tour = constructions[method]
+        elif method == 'greedy':
+            tour = constructions[method] = greedy_edge_tour(distance)
+        elif method == 'curve':
+            tour = constructions[method] = space_filling_curve_tour(distance.coordinates)
+        else:
+            raise ValueError("Value is not permitted")
+        if i >= len(methods):
+            for _ in range(perturbation):
+                tour = double_bridge(tour, rng)
+        tours.append(tour)
+    return tours
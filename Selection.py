@@ -0,0 +1,122 @@
+import numpy as np
+from RandomStream import RandomStream, stream
+
+
+def roulette(fitness: np.ndarray, count: int, rng: RandomStream = None) -> np.ndarray:
+    """
+    Fitness-proportional selection by a binary search in the cumulative
+    fitness, as np.random.choice with p = fitness / sum(fitness) does it.
+    :param fitness: the fitness of every individual
+    :param count: the number of individuals to select
+    :param rng: the RandomStream of the run
+    :return: an array of the indices of the selected individuals
+    """
+    cdf = (fitness / np.sum(fitness)).cumsum()
+    cdf /= cdf[-1]
+    return cdf.searchsorted(stream(rng).generator.random(count), side='right')
+
+
+class AliasTable:
+    def __init__(self, fitness: np.ndarray):
+        """
+        Build Walker's alias table of the fitness, after which every
+        fitness-proportional draw costs O(1): a column is drawn uniformly
+        and then either it or its alias is taken.
+        The table is the one of the sweep which fills the light columns
+        (scaled fitness below 1) from the heavy ones in order, a heavy
+        column being filled from the next heavy one once it has become
+        light itself. It is built from the prefix sums of the deficits of
+        the light columns and of the surpluses of the heavy ones.
+        :param fitness: the fitness of every individual
+        """
+        n = len(fitness)
+        scaled = np.asarray(fitness, dtype=np.float64) * n / np.sum(fitness)
+        light = np.flatnonzero(scaled < 1.)
+        heavy = np.flatnonzero(scaled >= 1.)
+        self.probability = np.ones(n)
+        self.alias = np.arange(n)
+        # equal fitness can scale to just below 1 everywhere, there is no heavy column
+        # then and every column keeps itself, which is exact up to the rounding
+        if len(light) == 0 or len(heavy) == 0:
+            return
+        ends = np.cumsum(1. - scaled[light])
+        surplus = np.cumsum(scaled[heavy] - 1.)
+        # a light column is filled by the heavy one whose surplus its deficit starts in
+        donor = np.minimum(np.searchsorted(surplus, ends - (1. - scaled[light]), side='left'), len(heavy) - 1)
+        self.probability[light] = scaled[light]
+        self.alias[light] = heavy[donor]
+        # a heavy column keeps what its lights did not take, the next heavy one fills the rest
+        crossing = np.searchsorted(ends, surplus[:-1], side='right')
+        overshoot = np.where(crossing < len(light), ends[np.minimum(crossing, len(light) - 1)] - surplus[:-1], 0.)
+        self.probability[heavy[:-1]] = np.clip(1. - overshoot, 0., 1.)
+        self.alias[heavy[:-1]] = heavy[1:]
+
+    def sample(self, count: int, rng: RandomStream = None) -> np.ndarray:
+        """
+        :return: an array of count indices drawn proportionally to the fitness
+        """
+        generator = stream(rng).generator
+        columns = generator.integers(len(self.alias), size=count)
+        keep = generator.random(count) < self.probability[columns]
+        return np.where(keep, columns, self.alias[columns])
+
+
+def distinct(n: int, count: int, k: int, rng: RandomStream = None) -> np.ndarray:
+    """
+    Draw count rows of k different indices below n in one call. Column j is
+    drawn below n - j and moved past the indices already in its row.
+    :return: a (count, k) array
+    """
+    draws = stream(rng).generator.integers(0, n - np.arange(k), size=(count, k))
+    for j in range(1, k):
+        taken = np.sort(draws[:, :j], axis=1)
+        for i in range(j):
+            draws[:, j] += draws[:, j] >= taken[:, i]
+    return draws
+
+
+def tournament(fitness: np.ndarray, count: int, k: int = 2, rng: RandomStream = None) -> np.ndarray:
+    """
+    Run count k-way tournaments among different individuals at once, the
+    fittest competitor of each wins (the first one on a tie).
+    :param fitness: the fitness of every individual
+    :param count: the number of tournaments
+    :param k: the tournament size
+    :param rng: the RandomStream of the run
+    :return: an array of the indices of the winners
+    """
+    if k > len(fitness):
+        raise ValueError("Tournament size is larger than population size")
+    competitors = distinct(len(fitness), count, k, rng)
+    return competitors[np.arange(count), np.argmax(fitness[competitors], axis=1)]
+
+
+def truncation(fitness: np.ndarray, count: int) -> np.ndarray:
+    """
+    Select the count fittest individuals with a partition instead of a full
+    sort. They are in the order of a sort by fitness, the larger index first
+    on a tie, as in the elitism of TSPProblem.select.
+    :return: an array of the indices of the selected individuals
+    """
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if count >= len(fitness):
+        return np.lexsort((np.arange(len(fitness)), fitness))[::-1]
+    kth = np.partition(fitness, len(fitness) - count)[len(fitness) - count]
+    greater = np.flatnonzero(fitness > kth)
+    equal = np.flatnonzero(fitness == kth)[::-1][:count - len(greater)]
+    chosen = np.concatenate((greater, equal))
+    return chosen[np.lexsort((chosen, fitness[chosen]))[::-1]]
+
+
+if __name__ == '__main__':
+    # check that the alias tables give every individual its share of the fitness
+    rng = np.random.default_rng(0)
+    for fitness in (rng.random(50), 1. / rng.uniform(400., 800., 200), np.full(50, 1. / 426), np.full(20, 0.1),
+                    np.array([1., 1e-9, 1e-9, 1e-9]), np.ones(1)):
+        table = AliasTable(fitness)
+        n = len(fitness)
+        mass = table.probability / n + np.bincount(table.alias, weights=(1. - table.probability) / n, minlength=n)
+        error = np.max(np.abs(mass - fitness / np.sum(fitness)))
+        assert error < 1e-12, error
+    print('ok')
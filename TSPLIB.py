@@ -0,0 +1,159 @@
+import os
+import numpy as np
+
+# the keywords which start a data part instead of a "KEY : value" header line
+sections = ('NODE_COORD_SECTION', 'DISPLAY_DATA_SECTION', 'EDGE_WEIGHT_SECTION', 'FIXED_EDGES_SECTION',
+            'TOUR_SECTION', 'DEPOT_SECTION', 'DEMAND_SECTION', 'EOF')
+
+
+def nint(x: np.ndarray) -> np.ndarray:
+    """
+    The nearest integer function of TSPLIB, (int) (x + 0.5).
+    """
+    return np.floor(x + 0.5)
+
+
+def euclidean(first: np.ndarray, second: np.ndarray, rounded: bool = False) -> np.ndarray:
+    difference = first - second
+    distance = np.sqrt((difference ** 2).sum(axis=-1))
+    return nint(distance) if rounded else distance
+
+
+def ceil_euclidean(first: np.ndarray, second: np.ndarray, rounded: bool = False) -> np.ndarray:
+    distance = euclidean(first, second)
+    return np.ceil(distance) if rounded else distance
+
+
+def pseudo_euclidean(first: np.ndarray, second: np.ndarray, rounded: bool = False) -> np.ndarray:
+    difference = first - second
+    distance = np.sqrt((difference ** 2).sum(axis=-1) / 10.)
+    if not rounded:
+        return distance
+    rounded_distance = nint(distance)
+    return np.where(rounded_distance < distance, rounded_distance + 1, rounded_distance)
+
+
+def geographical(first: np.ndarray, second: np.ndarray, rounded: bool = False) -> np.ndarray:
+    def radians(coordinates):
+        # the coordinates are DDD.MM, degrees and minutes
+        degrees = np.trunc(coordinates)
+        return 3.141592 * (degrees + 5. * (coordinates - degrees) / 3.) / 180.
+
+    first, second = radians(first), radians(second)
+    q1 = np.cos(first[..., 1] - second[..., 1])
+    q2 = np.cos(first[..., 0] - second[..., 0])
+    q3 = np.cos(first[..., 0] + second[..., 0])
+    distance = 6378.388 * np.arccos(np.clip(0.5 * ((1. + q1) * q2 - (1. - q1) * q3), -1., 1.))
+    return np.trunc(distance + 1.) if rounded else distance
+
+
+metrics = {'EUC_2D': euclidean, 'CEIL_2D': ceil_euclidean, 'ATT': pseudo_euclidean, 'GEO': geographical}
+
+
+def metric(edge_weight_type: str, rounded: bool = False):
+    """
+    Get the distance function of an EDGE_WEIGHT_TYPE.
+    :param edge_weight_type: EUC_2D, CEIL_2D, ATT or GEO
+    :param rounded: whether to round the distances to integers as TSPLIB
+    defines it. Without rounding EUC_2D and CEIL_2D are the plain
+    Euclidean distance, which is what the GA has always used.
+    :return: a function of two (broadcastable) coordinate arrays
+    """
+    if edge_weight_type not in metrics:
+        raise ValueError("EDGE_WEIGHT_TYPE %s is not supported" % edge_weight_type)
+    function = metrics[edge_weight_type]
+    return lambda first, second: function(first, second, rounded)
+
+
+def parse(file_name: str) -> dict:
+    """
+    Read a TSPLIB file. The header is parsed by keyword and the
+    NODE_COORD_SECTION is read in bulk.
+    :param file_name: the .tsp file
+    :return: a dict with the header keywords (NAME, DIMENSION, ...), ids
+    (the city numbers in the file) and coordinates (an (n, 2) float array)
+    """
+    with open(file_name, 'r') as problem:
+        lines = problem.read().splitlines()
+
+    header = {}
+    i = 0
+    while i < len(lines) and lines[i].strip().split(':')[0].strip() not in sections:
+        if ':' in lines[i]:
+            key, value = lines[i].split(':', 1)
+            header[key.strip()] = value.strip()
+        i += 1
+    if i == len(lines) or lines[i].strip().split(':')[0].strip() != 'NODE_COORD_SECTION':
+        raise ValueError("%s has no NODE_COORD_SECTION" % file_name)
+
+    dimension = int(header['DIMENSION'])
+    data = np.array(' '.join(lines[i + 1: i + 1 + dimension]).split(), dtype=np.float64)
+    if len(data) != 3 * dimension:
+        raise ValueError("%s has not %d cities in NODE_COORD_SECTION" % (file_name, dimension))
+    data = data.reshape(dimension, 3)
+
+    header['DIMENSION'] = dimension
+    header.setdefault('EDGE_WEIGHT_TYPE', 'EUC_2D')
+    header['ids'] = data[:, 0].astype(np.int64)
+    header['coordinates'] = data[:, 1:]
+    return header
+
+
+def cache_name(file_name: str) -> str:
+    return os.path.splitext(file_name)[0] + '.npz'
+
+
+def load(file_name: str, cache: bool = True) -> dict:
+    """
+    Load a TSPLIB file through a binary cache. The first load writes
+    <name>.npz next to the file, later loads read it unless the .tsp file
+    has changed since.
+    :param file_name: the .tsp file
+    :param cache: whether to read and write the cache
+    :return: see parse
+    """
+    stat = os.stat(file_name)
+    source = np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+    if cache and os.path.exists(cache_name(file_name)):
+        with np.load(cache_name(file_name)) as data:
+            if np.array_equal(data['source'], source):
+                header = {key: str(data[key]) for key in data.files if key not in ('source', 'ids', 'coordinates')}
+                header['DIMENSION'] = int(header['DIMENSION'])
+                header['ids'] = data['ids']
+                header['coordinates'] = data['coordinates']
+                return header
+
+    header = parse(file_name)
+    if cache:
+        arrays = {key: np.array(str(value)) for key, value in header.items() if key not in ('ids', 'coordinates')}
+        # write to a temporary file of this process first, so a crashed run never leaves half a cache
+        # and parallel runs which load the same file do not write over each other's
+        temporary = '%s.%d.tmp.npz' % (cache_name(file_name), os.getpid())
+        np.savez(temporary, source=source, ids=header['ids'], coordinates=header['coordinates'], **arrays)
+        os.replace(temporary, cache_name(file_name))
+    return header
+
+
+def distance_cache_name(file_name: str, rounded: bool, dtype) -> str:
+    return '%s.%s.%s.npy' % (os.path.splitext(file_name)[0], 'rounded' if rounded else 'exact', np.dtype(dtype).name)
+
+
+def load_distance(file_name: str, rounded: bool, dtype):
+    """
+    Open the cached distance matrix of a file as a read-only memory map.
+    :return: the matrix, or None when there is no up-to-date cache
+    """
+    name = distance_cache_name(file_name, rounded, dtype)
+    if not os.path.exists(name) or os.stat(name).st_mtime_ns < os.stat(file_name).st_mtime_ns:
+        return None
+    return np.load(name, mmap_mode='r')
+
+
+def save_distance(file_name: str, rounded: bool, matrix: np.ndarray) -> None:
+    """
+    Write the distance matrix of a file to the cache read by load_distance.
+    """
+    name = distance_cache_name(file_name, rounded, matrix.dtype)
+    temporary = '%s.%d.tmp.npy' % (name, os.getpid())
+    np.save(temporary, matrix)
+    os.replace(temporary, name)
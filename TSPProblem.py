@@ -1,6 +1,13 @@
-import random
+import collections
 import numpy as np
-import linecache
+import TSPLIB
+from CandidateList import CandidateList
+import Seeding
+import Replacement
+import Selection
+import Diversity
+from RandomStream import RandomStream, stream
+from Instrumentation import timer
 
 
 class City:
@@ -28,42 +35,180 @@ class City:
         return np.sqrt(x_distance ** 2 + y_distance ** 2)
 
 
-class Individual:
-    def __init__(self, city_list, randomly=True):
-        if randomly:
-            self.city_route = random.sample(city_list, len(city_list))
+class DistanceMatrix:
+    def __init__(self, coordinates, dense_limit: int = 5000, dtype=np.float64, metric=None,
+                 matrix: np.ndarray = None):
+        """
+        Initial the distances of a TSP Problem. The distances are computed
+        once here and shared by every individual of the problem.
+        Problems with at most dense_limit cities keep a dense n*n matrix,
+        larger problems compute the distances on the fly from the coordinates.
+        :param coordinates: an (n, 2) array, the i-th row is the i-th city
+        :param dense_limit: the largest problem which gets a dense matrix
+        :param dtype: np.float64 or np.float32, the type of the dense matrix
+        :param metric: a function of two coordinate arrays, see TSPLIB.metric.
+        The Euclidean distance by default.
+        :param matrix: a dense matrix computed before, e.g. a memory map of
+        the TSPLIB cache
+        """
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        self.n = len(self.coordinates)
+        self.metric = metric if metric is not None else TSPLIB.euclidean
+        # the CandidateList of the problem, if it has one
+        self.candidates = None
+        self.dense = matrix is not None or self.n <= dense_limit
+        if matrix is not None:
+            self.matrix = matrix
+        elif self.dense:
+            # a block of rows at a time keeps the temporary arrays small
+            self.matrix = np.empty((self.n, self.n), dtype=dtype)
+            for start in range(0, self.n, 512):
+                rows = np.arange(start, min(start + 512, self.n))
+                self.matrix[rows] = self.pairs(rows[:, None], np.arange(self.n)[None, :])
         else:
-            self.city_route = city_list
+            self.matrix = None
+
+    def pairs(self, first, second) -> np.ndarray:
+        """
+        Calculate the distances between two (broadcastable) arrays of city
+        indices directly from the coordinates.
+        :param first: indices of the first cities
+        :param second: indices of the second cities
+        :return: the distances
+        """
+        return self.metric(self.coordinates[first], self.coordinates[second])
+
+    def distance(self, first: int, second: int) -> float:
+        """
+        Get the distance between two cities.
+        :param first: the index of the first city
+        :param second: the index of the second city
+        :return: the distance
+        """
+        if self.dense:
+            return float(self.matrix[first, second])
+        return float(self.pairs(first, second))
+
+    def route_distance(self, route) -> float:
+        """
+        Calculate the length of a closed route.
+        :param route: the city indices in visiting order
+        :return: the route length
+        """
+        return float(self.route_distances(route))
+
+    def route_distances(self, routes) -> np.ndarray:
+        """
+        Calculate the lengths of many closed routes in one pass.
+        :param routes: an (m, n) array, each row is a route
+        :return: an array of m route lengths
+        """
+        routes = np.asarray(routes)
+        following = np.roll(routes, -1, axis=-1)
+        if self.dense:
+            return self.matrix[routes, following].sum(axis=-1, dtype=np.float64)
+        return self.pairs(routes, following).sum(axis=-1)
+
+
+class Individual:
+    def __init__(self, route, city_list: list, distance: DistanceMatrix = None):
+        """
+        Initial an individual. The route is stored as a permutation of the
+        city indices, the City objects are only looked up for output.
+        :param route: the city indices in visiting order
+        :param city_list: the cities of the problem, shared by every individual
+        :param distance: the distance matrix of the problem
+        """
+        self.route = np.asarray(route, dtype=np.int32)
+        self.city_list = city_list
+        self.distance = distance
+        # the cached route length, None means it has to be evaluated again
+        self.cost = None
+
+    @property
+    def city_route(self) -> list:
+        """
+        The route as a list of City objects.
+        """
+        return [self.city_list[i] for i in self.route]
 
-    # def route_distance(self) -> int:
-    #     dist = 0
-    #     for i in range(len(self.city_route)-1):
-    #         dist += self.city_route[i].city_distance(self.city_route[i+1])
-    #     return dist
     def route_distance(self) -> float:
+        if self.cost is None:
+            self.cost = self.evaluate()
+        return self.cost
+
+    def evaluate(self) -> float:
+        """
+        Calculate the route length without looking at the cache.
+        :return: the route length
+        """
+        if self.distance is not None:
+            return self.distance.route_distance(self.route)
+        city_route = self.city_route
         dist = 0
-        size = len(self.city_route)
+        size = len(city_route)
         for i in range(size - 1):
-            dist += self.city_route[i].city_distance(self.city_route[i + 1])
-        dist += self.city_route[size - 1].city_distance(self.city_route[0])
+            dist += city_route[i].city_distance(city_route[i + 1])
+        dist += city_route[size - 1].city_distance(city_route[0])
         return dist
 
+    def tour_hash(self) -> int:
+        """
+        :return: a hash of the tour which does not depend on its starting city and direction
+        """
+        return Diversity.tour_hashes(self.route)[0]
+
+    def edge_distance(self, first_city: int, second_city: int) -> float:
+        """
+        Get the distance between two cities given by their indices.
+        :param first_city:
+        :param second_city:
+        :return: the distance
+        """
+        if self.distance is not None:
+            return self.distance.distance(first_city, second_city)
+        return self.city_list[first_city].city_distance(self.city_list[second_city])
+
+    def edges_distance(self, positions) -> float:
+        """
+        Sum the lengths of the route edges which start at the given positions,
+        the edge at position i joins route[i] and route[i + 1].
+        :param positions: the route positions
+        :return: the total length
+        """
+        size = len(self.route)
+        return sum(self.edge_distance(self.route[p], self.route[(p + 1) % size]) for p in positions)
+
+    def invert(self, first_index: int, second_index: int) -> float:
+        """
+        Reverse route[first_index:second_index], 0 <= first_index < second_index <= n.
+        Only the two edges at the borders of the segment change.
+        :return: the change of the route length
+        """
+        size = len(self.route)
+        a, b = self.route[first_index - 1], self.route[first_index]
+        c, d = self.route[second_index - 1], self.route[second_index % size]
+        delta = self.edge_distance(a, c) + self.edge_distance(b, d) \
+            - self.edge_distance(a, b) - self.edge_distance(c, d)
+        self.route[first_index:second_index] = self.route[first_index:second_index][::-1].copy()
+        return delta
+
     def exchange(self, first_index: int, second_index: int) -> None:
         """
-        Exchange the city_route value which is correspond to the indices
+        Exchange the route value which is correspond to the indices
         :param first_index:
         :param second_index:
         :return:
         """
-
-        if first_index not in range(len(self.city_route)) \
-                or second_index not in range(len(self.city_route)):
+        size = len(self.route)
+        if not (0 <= first_index < size and 0 <= second_index < size):
             raise IndexError("Index is out of boundary")
 
-        self.city_route[first_index], self.city_route[second_index] = \
-            self.city_route[second_index], self.city_route[first_index]
+        self.route[first_index], self.route[second_index] = \
+            self.route[second_index], self.route[first_index]
+        self.cost = None
 
-    def mutation(self, mutation_method: int) -> None:
+    def mutation(self, mutation_method: int, rng: RandomStream = None) -> float:
         """
         Do the mutation operation.
         :param mutation_method: this parameter represents a mutation method.
@@ -74,64 +219,127 @@ class Individual:
         2 -> swap
         3 -> inversion
         4 -> scramble
+        5 -> neighbour inversion, needs the candidate list of the problem
 
         The detail information can be seen in https://en.wikipedia.org/wiki/Mutation
+        :param rng: the RandomStream of the run, the shared default one if None
+        :return: the change of the route length. Insert, swap and the
+        inversions compute it from the few edges they replace and update
+        the cached route length in place.
         """
+        rng = stream(rng)
+        size = len(self.route)
+        cost = self.cost
 
         # The insert method
         if mutation_method == 1:
-            first_index = random.randint(0, len(self.city_route) - 1)
-            second_index = random.randint(0, len(self.city_route) - 1)
+            first_index = rng.randrange(size)
+            second_index = rng.randrange(size)
             if first_index == second_index:
-                return
+                return 0.
             first_index, second_index = min(first_index, second_index), \
                                         max(first_index, second_index)
-
-            for i in range(second_index, first_index + 1, -1):
-                self.exchange(i - 1, i)
+            if second_index == first_index + 1:
+                return 0.
+
+            # route[second_index] moves between route[first_index] and route[first_index + 1]
+            a, b = self.route[first_index], self.route[first_index + 1]
+            p, s = self.route[second_index - 1], self.route[second_index]
+            q = self.route[(second_index + 1) % size]
+            delta = self.edge_distance(a, s) + self.edge_distance(s, b) + self.edge_distance(p, q) \
+                - self.edge_distance(a, b) - self.edge_distance(p, s) - self.edge_distance(s, q)
+            self.route[first_index + 1:second_index + 1] = \
+                np.roll(self.route[first_index + 1:second_index + 1], 1)
 
         # The swap method
         elif mutation_method == 2:
-            first_index = random.randint(0, len(self.city_route) - 1)
-            second_index = random.randint(0, len(self.city_route) - 1)
+            first_index = rng.randrange(size)
+            second_index = rng.randrange(size)
             if first_index == second_index:
-                return
+                return 0.
             first_index, second_index = min(first_index, second_index), \
                                         max(first_index, second_index)
+            positions = {(first_index - 1) % size, first_index, second_index - 1, second_index}
+            delta = -self.edges_distance(positions)
             self.exchange(first_index, second_index)
+            delta += self.edges_distance(positions)
 
         # The Inversion method
         elif mutation_method == 3:
-            first_index = random.randint(0, len(self.city_route) - 1)
-            second_index = random.randint(0, len(self.city_route) - 1)
+            first_index = rng.randrange(size)
+            second_index = rng.randrange(size)
             if first_index == second_index:
-                return
+                return 0.
             first_index, second_index = min(first_index, second_index), \
                                         max(first_index, second_index)
-            self.city_route[first_index:second_index] = \
-                reversed(self.city_route[first_index:second_index])
+
+            delta = self.invert(first_index, second_index)
+
+        # The neighbour inversion method, a city and one of its nearest neighbours become adjacent
+        elif mutation_method == 5:
+            candidates = self.distance.candidates if self.distance is not None else None
+            if candidates is None:
+                raise ValueError("The neighbour inversion needs the candidate list of the problem")
+            first_index = rng.randrange(size)
+            neighbour = candidates[self.route[first_index]][rng.randrange(candidates.k)]
+            second_index = int(np.flatnonzero(self.route == neighbour)[0])
+            if abs(first_index - second_index) == 1:
+                return 0.
+            if second_index > first_index:
+                delta = self.invert(first_index + 1, second_index + 1)
+            else:
+                delta = self.invert(second_index, first_index)
 
         # The Scramble method
         elif mutation_method == 4:
-            fixed_number = random.randint(range(len(self.city_route) + 1))
-            fixed_indices = random.sample(range(len(self.city_route)), fixed_number)
-            fixed = [(pos, item) for (pos, item) in enumerate(self.city_route) if pos in fixed_indices]
-            random.shuffle(self.city_route)
-
-            for pos, item in fixed:
-                index = self.city_route.index(item)
-                self.exchange(pos, index)
+            # a random number of cities keep their positions, the others are shuffled
+            fixed = np.zeros(size, dtype=bool)
+            fixed[rng.sample(size, rng.randint(0, size))] = True
+            free = np.flatnonzero(~fixed)
+            before = self.route_distance()
+            self.route[free] = self.route[free][rng.generator.permutation(len(free))]
+            self.cost = None
+            return self.route_distance() - before
 
         # Other methods are forbidden
         else:
             raise ValueError("Value is not permitted")
 
+        self.cost = None if cost is None else cost + delta
+        return delta
+
 
 class Population:
-    def __init__(self, population_number: int, city_list: list):
-        self.individual_list = []
-        for i in range(population_number):
-            self.individual_list.append(Individual(city_list))
+    def __init__(self, population_number: int, city_list: list, distance: DistanceMatrix = None,
+                 rng: RandomStream = None):
+        """
+        Initial a population of random routes. The routes of all the
+        individuals are the rows of one (population_number, n) int32 array.
+        :param population_number: the number of individuals
+        :param city_list: the cities of the problem
+        :param distance: the distance matrix of the problem
+        :param rng: the RandomStream of the run, the shared default one if None
+        """
+        self.rng = stream(rng)
+        self.city_list = city_list
+        self.distance = distance
+        # the number of full route evaluations so far
+        self.evaluations = 0
+        # an Instrumentation.Profiler, None disables the timers
+        self.profiler = None
+        # the Replacement.CostHeap of the route lengths, built when a replacement needs it
+        self.heap = None
+        # the tour hash of every row and how many rows have each, built by hashes and kept up to date by replace
+        self.row_hashes = None
+        self.hash_counts = None
+        # the Diversity.EdgeFrequency of the routes in edge_routes, updated by edge_entropy
+        self.edge_table = None
+        self.edge_routes = None
+        routes = np.argsort(self.rng.generator.random((population_number, len(city_list))), axis=1)
+        self.change([Individual(route, city_list, distance) for route in routes])
+
+    def __len__(self):
+        return len(self.individual_list)
 
     def crossover(self, crossover_method: int, parent1: Individual, parent2: Individual) -> (Individual, Individual):
         """
@@ -151,275 +359,433 @@ class Population:
 
         :return: a tuple which represents (offspring1, offspring2)
         """
+        route1, route2 = parent1.route, parent2.route
+        size = len(route1)
+        # position1[city] is the position of city in route1, the same for position2
+        position1 = np.empty(size, dtype=np.int32)
+        position1[route1] = np.arange(size, dtype=np.int32)
+        position2 = np.empty(size, dtype=np.int32)
+        position2[route2] = np.arange(size, dtype=np.int32)
 
         # OrderCrossover
         if crossover_method == 1:
             # select the start and end point for the crossFragment randomly
-            m, n = random.sample(range(len(parent1.city_route)), 2)
+            m, n = self.rng.sample(size, 2)
             start, end = min(m, n), max(m, n)
-            cross1 = parent1.city_route[start: end + 1]
-            cross2 = parent2.city_route[start: end + 1]
-
-            # shallow-copy
-            offspring1 = []
-            for x in parent1.city_route:
-                offspring1.append(x)
-            offspring2 = []
-            for y in parent2.city_route:
-                offspring2.append(y)
-            size = len(parent1.city_route)
-
-            # sort the elements in parent2 which doesn't in cross1, do the same thing for parent1
-            sort2 = []
-            sort1 = []
-            for i in range(size):
-                index2 = (end + 1 + i) % size
-                if not (parent2.city_route[index2] in cross1):
-                    sort2.append(parent2.city_route[index2])
-
-                index1 = (end + 1 + i) % size
-                if not (parent1.city_route[index1] in cross2):
-                    sort1.append(parent1.city_route[index1])
-
-            for i in range(len(sort2)):
-                p1 = (end + 1 + i) % size
-                offspring1[p1] = sort2[i]
-
-                p2 = (end + 1 + i) % size
-                offspring2[p2] = sort1[i]
-
-            return Individual(offspring1, False), Individual(offspring2, False)
+            in_cross1 = np.zeros(size, dtype=bool)
+            in_cross1[route1[start: end + 1]] = True
+            in_cross2 = np.zeros(size, dtype=bool)
+            in_cross2[route2[start: end + 1]] = True
+
+            # the parents read from end + 1 on, without the cities of the other crossFragment
+            order = (end + 1 + np.arange(size)) % size
+            sort2 = route2[order][~in_cross1[route2[order]]]
+            sort1 = route1[order][~in_cross2[route1[order]]]
+
+            offspring1 = route1.copy()
+            offspring1[order[:len(sort2)]] = sort2
+            offspring2 = route2.copy()
+            offspring2[order[:len(sort1)]] = sort1
+
+            return self.offspring(offspring1, parent1, parent2), self.offspring(offspring2, parent1, parent2)
 
         # PMXCrossover
         elif crossover_method == 2:
             # select the start and end point for the crossFragment randomly
-            m, n = random.sample(range(len(parent1.city_route)), 2)
+            m, n = self.rng.sample(size, 2)
             start, end = min(m, n), max(m, n)
-            cross1 = parent1.city_route[start: end + 1]
-            cross2 = parent2.city_route[start: end + 1]
-
-            # shallow-copy
-            offspring1 = []
-            for x in parent1.city_route:
-                offspring1.append(x)
-            offspring2 = []
-            for y in parent2.city_route:
-                offspring2.append(y)
-            size = len(parent1.city_route)
-            # put elements in cross2 which haven't be copied into the right position in offspring1
-            for i in range(end + 1 - start):
-                # operate for cross2
-                if cross2[i] in cross1:
-                    continue
-                else:
-                    tmp = cross1[i]
-                    index2 = parent2.city_route.index(tmp)
-                    # when the position is taken
+            in_cross1 = np.zeros(size, dtype=bool)
+            in_cross1[route1[start: end + 1]] = True
+            in_cross2 = np.zeros(size, dtype=bool)
+            in_cross2[route2[start: end + 1]] = True
+            in_cross1, in_cross2 = in_cross1.tolist(), in_cross2.tolist()
+
+            offspring1 = route2.copy()
+            offspring1[start: end + 1] = route1[start: end + 1]
+            offspring2 = route1.copy()
+            offspring2[start: end + 1] = route2[start: end + 1]
+
+            # put the cities of one crossFragment which are missing from the other one
+            # into the position found by following the mapping out of the fragment
+            list1, list2 = route1.tolist(), route2.tolist()
+            index_of1, index_of2 = position1.tolist(), position2.tolist()
+            for i in range(start, end + 1):
+                if not in_cross1[list2[i]]:
+                    index2 = index_of2[list1[i]]
                     while start <= index2 <= end:
-                        tmp = parent1.city_route[index2]
-                        index2 = parent2.city_route.index(tmp)
-                    offspring1[index2] = cross2[i]
-
-            # copy the rest elements from parent2 to offspring1
-            for i in range(size):
-                if (parent2.city_route[i] in cross1) or (parent2.city_route[i] in cross2):
-                    continue
-                else:
-                    offspring1[i] = parent2.city_route[i]
+                        index2 = index_of2[list1[index2]]
+                    offspring1[index2] = list2[i]
 
-            # do the same thing for cross2
-            for j in range(end + 1 - start):
-                if cross1[j] in cross2:
-                    continue
-                else:
-                    tmp = cross2[j]
-                    index1 = parent1.city_route.index(tmp)
+                if not in_cross2[list1[i]]:
+                    index1 = index_of1[list2[i]]
                     while start <= index1 <= end:
-                        tmp = parent2.city_route[index1]
-                        index1 = parent1.city_route.index(tmp)
-                    offspring2[index1] = cross1[j]
+                        index1 = index_of1[list2[index1]]
+                    offspring2[index1] = list1[i]
 
-            for j in range(size):
-                if (parent1.city_route[j] in cross1) or (parent1.city_route[j] in cross2):
-                    continue
-                else:
-                    offspring2[j] = parent1.city_route[j]
-
-            return Individual(offspring1, False), Individual(offspring2, False)
+            return self.offspring(offspring1, parent1, parent2), self.offspring(offspring2, parent1, parent2)
 
         # CycleCrossover
         elif crossover_method == 3:
-            x = random.randint(0, len(parent1.city_route) - 1)
+            x = self.rng.randrange(size)
 
-            flag = [False] * len(parent1.city_route)
+            flag = np.zeros(size, dtype=bool)
             flag[x] = True
 
-            tmp = parent2.city_route[x]
-            while tmp != parent1.city_route[x]:
-                p = parent1.city_route.index(tmp)
+            list2, index_of1 = route2.tolist(), position1.tolist()
+            tmp = list2[x]
+            while tmp != int(route1[x]):
+                p = index_of1[tmp]
                 flag[p] = True
-                tmp = parent2.city_route[p]
-
-            offspring1 = []
-            offspring2 = []
-            for i in range(len(parent1.city_route)):
-                if flag[i]:
-                    offspring2.append(parent1.city_route[i])
-                    offspring1.append(parent2.city_route[i])
-                else:
-                    offspring2.append(parent2.city_route[i])
-                    offspring1.append(parent1.city_route[i])
+                tmp = list2[p]
+
+            offspring1 = np.where(flag, route2, route1)
+            offspring2 = np.where(flag, route1, route2)
 
-            return Individual(offspring1, False), Individual(offspring2, False)
+            return self.offspring(offspring1, parent1, parent2), self.offspring(offspring2, parent1, parent2)
 
         # EdgeRecombination
         elif crossover_method == 4:
-            # construct the Table of Edges
-            table = []
-            size = len(parent1.city_route)
-            for i in range(size):
-                element = parent1.city_route[i]
-                edges = [parent1.city_route[(i + 1) % size], parent1.city_route[(i - 1) % size]]
-                index = parent2.city_route.index(element)
-                edges.append(parent2.city_route[(index + 1) % size])
-                edges.append(parent2.city_route[(index - 1) % size])
-                table.append(edges)
+            # construct the Table of Edges, table[city] holds its neighbours in both parents
+            table = np.stack([np.roll(route1, -1)[position1], np.roll(route1, 1)[position1],
+                              np.roll(route2, -1)[position2], np.roll(route2, 1)[position2]], axis=1).tolist()
             # choose the start city randomly
-            offspring1 = []
-            offspring2 = []
-            start1, start2 = random.sample(range(size), 2)
-            startElement1 = parent1.city_route[start1]
-            startElement2 = parent1.city_route[start2]
-            offspring1.append(startElement1)
-            offspring2.append(startElement2)
-
-            nextElement = None
-            shortest = 5
-            # generate 2 offspring based on the Table of Edges
-            while len(offspring1) != size:
-                if len(offspring1) == 1:
-                    choices = list(filter(lambda k: k not in offspring1, table[start1]))
-                else:
-                    choices = list(filter(lambda k: k not in offspring1, table[parent1.city_route.index(nextElement)]))
-                haveCommonEdge = False
-                shortest = 5
-                if len(choices) == 1:
-                    nextElement = choices[0]
-                    offspring1.append(nextElement)
-                    continue
-
-                for i in range(len(choices)):
-                    choice = choices[i]
-                    for j in range(i + 1, len(choices)):
-                        otherChoice = choices[j]
-                        if choice == otherChoice and i != j:
-                            haveCommonEdge = True
-                            break
-                    if haveCommonEdge:
-                        nextElement = choice
-                        break
-                    else:
-                        entityChoices = list(
-                            filter(lambda k: k not in offspring1, table[parent1.city_route.index(choice)]))
-                        entityChoices = list(set(entityChoices))
-                        length = len(entityChoices)
-                        if length < shortest:
-                            shortest = length
-                            nextElement = choice
-
-                offspring1.append(nextElement)
-
-            while len(offspring2) != size:
-                if len(offspring2) == 0:
-                    choices = list(filter(lambda k: k not in offspring2, table[start2]))
-                else:
-                    choices = list(filter(lambda k: k not in offspring2, table[parent1.city_route.index(nextElement)]))
-                haveCommonEdge = False
-                shortest = 5
-                if len(choices) == 1:
-                    nextElement = choices[0]
-                    offspring2.append(nextElement)
-                    continue
-
-                for choice in choices:
-                    for otherChoice in choices:
-                        if choice == otherChoice and choices.index(choice) != choices.index(otherChoice):
-                            haveCommonEdge = True
-                            break
-                    if haveCommonEdge:
-                        nextElement = choice
-                        break
-                    else:
-                        entityChoices = list(
-                            filter(lambda k: k not in offspring2, table[parent1.city_route.index(choice)]))
-                        entityChoices = list(set(entityChoices))
-                        length = len(entityChoices)
-                        if length < shortest:
-                            shortest = length
-                            nextElement = choice
-
-                offspring2.append(nextElement)
-            return Individual(offspring1, False), Individual(offspring2, False)
+            start1, start2 = self.rng.sample(size, 2)
+            offspring1 = self.edge_recombination(table, route1[start1], self.rng)
+            offspring2 = self.edge_recombination(table, route1[start2], self.rng)
+
+            return self.offspring(offspring1, parent1, parent2), self.offspring(offspring2, parent1, parent2)
 
         # Other methods are forbidden
         else:
             raise ValueError("Value is not permitted")
 
+    @staticmethod
+    def edge_recombination(table: list, start: int, rng: RandomStream = None) -> np.ndarray:
+        """
+        Build one offspring of the edge recombination from the Table of Edges.
+        The next city is a common neighbour of both parents if there is one,
+        otherwise the neighbour with the fewest unvisited neighbours. When
+        every neighbour has been visited a random unvisited city is taken.
+        :param table: table[city] is the list of the four neighbours of city
+        :param start: the first city
+        :param rng: the RandomStream of the run
+        :return: the route of the offspring
+        """
+        rng = stream(rng)
+        size = len(table)
+        visited = [False] * size
+        # the unvisited cities, where[city] is the position of city in unvisited
+        unvisited = list(range(size))
+        where = list(range(size))
+        route = []
+
+        nextElement = int(start)
+        while True:
+            route.append(nextElement)
+            visited[nextElement] = True
+            last = unvisited.pop()
+            if last != nextElement:
+                unvisited[where[nextElement]] = last
+                where[last] = where[nextElement]
+            if not unvisited:
+                break
+
+            choices = [k for k in table[nextElement] if not visited[k]]
+            if not choices:
+                nextElement = rng.choice(unvisited)
+                continue
+            if len(choices) == 1:
+                nextElement = choices[0]
+                continue
+
+            shortest = 5
+            for i, choice in enumerate(choices):
+                # a common edge of both parents
+                if choice in choices[i + 1:]:
+                    nextElement = choice
+                    break
+                length = len({k for k in table[choice] if not visited[k]})
+                if length < shortest:
+                    shortest = length
+                    nextElement = choice
+
+        return np.array(route, dtype=np.int32)
+
+    def offspring(self, route, parent1: Individual, parent2: Individual) -> Individual:
+        """
+        Build an offspring of two parents. When the offspring is a copy of
+        one of its parents it takes over the cached route length.
+        :param route: the route of the offspring
+        :param parent1: the first parent
+        :param parent2: the second parent
+        :return: the offspring
+        """
+        individual = Individual(route, self.city_list, self.distance)
+        for parent in (parent1, parent2):
+            if parent.cost is not None and np.array_equal(individual.route, parent.route):
+                individual.cost = parent.cost
+                break
+        return individual
+
     def change(self, list):
+        """
+        Replace the individuals. Their routes are copied into a new
+        population array and each individual keeps a view of its row.
+        :param list: the new individuals
+        """
+        self.routes = np.array([individual.route for individual in list], dtype=np.int32)
+        for individual, route in zip(list, self.routes):
+            individual.route = route
         self.individual_list = list
+        self.heap = None
+        self.row_hashes = None
+
+    def seed(self, ratio: float, methods=('nearest', 'greedy', 'curve'), perturbation: int = 1) -> None:
+        """
+        Replace a part of the random individuals by tours of constructive
+        heuristics, see Seeding.seeded_tours.
+        :param ratio: the part of the population which is seeded
+        :param methods: any of 'nearest', 'greedy' and 'curve'
+        :param perturbation: the number of double bridges per perturbed tour
+        """
+        number = int(round(ratio * len(self.individual_list)))
+        if number == 0:
+            return
+        if self.distance is None:
+            raise ValueError("Seeding needs the distance matrix of the problem")
+        for i, tour in enumerate(Seeding.seeded_tours(self.distance, number, methods, perturbation, self.rng)):
+            self.routes[i] = tour
+            self.individual_list[i].cost = None
+        self.heap = None
+        self.row_hashes = None
+
+    def change_routes(self, routes: np.ndarray) -> None:
+        """
+        Replace the individuals by new ones built from the rows of a route array.
+        :param routes: an (m, n) array of routes
+        """
+        self.routes = np.ascontiguousarray(routes, dtype=np.int32)
+        self.individual_list = [Individual(route, self.city_list, self.distance) for route in self.routes]
+        self.heap = None
+        self.row_hashes = None
+
+    def replace(self, index: int, route, cost: float) -> None:
+        """
+        Overwrite the route of an individual in place, see Replacement.
+        :param index: the individual
+        :param route: the new route
+        :param cost: its route length
+        """
+        self.routes[index] = route
+        self.individual_list[index].cost = cost
+        if self.heap is not None:
+            self.heap.update(index, cost)
+        if self.row_hashes is not None:
+            old = self.row_hashes[index]
+            self.hash_counts[old] -= 1
+            if self.hash_counts[old] == 0:
+                del self.hash_counts[old]
+            self.row_hashes[index] = Diversity.tour_hashes(self.routes[index])[0]
+            self.hash_counts[self.row_hashes[index]] += 1
+
+    def cost_heap(self) -> Replacement.CostHeap:
+        """
+        Get the heap of the route lengths, building it if the population
+        was changed otherwise than by replace.
+        """
+        if self.heap is None:
+            self.heap = Replacement.CostHeap(self.route_distances())
+        return self.heap
+
+    def immigrate(self, routes: np.ndarray, costs: np.ndarray = None) -> None:
+        """
+        Replace the worst individuals by migrants, in place.
+        :param routes: an (m, n) array, the routes of the migrants
+        :param costs: the route lengths of the migrants if they are known
+        """
+        worst = np.argsort(self.route_distances())[::-1][:len(routes)]
+        self.routes[worst] = routes
+        for i, index in enumerate(worst):
+            self.individual_list[index].cost = None if costs is None else float(costs[i])
+        self.heap = None
+        self.row_hashes = None
 
     def getindi(self, index):
         return self.individual_list[index]
 
-    def findLeastCost(self):
-        leastCost = float("inf")
-        tarIndividual = None
-        for x in self.individual_list:
-            if x.route_distance() < leastCost:
-                leastCost = x.route_distance()
-                tarIndividual = x
-        seqList = []
-        for city in tarIndividual.city_route:
-            seqList.append(str(city.seq))
-        return ' '.join(seqList), leastCost
+    def route_distances(self) -> np.ndarray:
+        """
+        Get the route lengths of all the individuals. Only the individuals
+        whose route changed since their last evaluation are evaluated, in
+        one pass over their rows of the population array.
+        :return: an array, the i-th value is the length of the i-th individual
+        """
+        return self.evaluate(self.individual_list, self.routes)
+
+    def evaluate(self, individuals: list, routes: np.ndarray = None) -> np.ndarray:
+        """
+        Get the route lengths of individuals, e.g. of offspring which are not
+        in the population yet, evaluating the dirty ones in one pass.
+        :param individuals: the individuals
+        :param routes: their routes as an array, stacked here when not given
+        :return: an array of their route lengths
+        """
+        with timer(self.profiler, 'route_distance'):
+            dirty = [i for i, individual in enumerate(individuals) if individual.cost is None]
+            self.evaluations += len(dirty)
+            if dirty and self.distance is not None:
+                if routes is None:
+                    routes = np.array([individuals[i].route for i in dirty])
+                else:
+                    routes = routes[dirty]
+                for i, cost in zip(dirty, self.distance.route_distances(routes)):
+                    individuals[i].cost = float(cost)
+            return np.array([individual.route_distance() for individual in individuals])
+
+    def diversity(self) -> float:
+        """
+        A cheap measure of the diversity: the share of distinct route lengths.
+        It is 1 when all the routes differ and 1 / population_number when
+        they are all the same.
+        """
+        costs = self.route_distances()
+        return len(np.unique(np.round(costs, 6))) / len(costs)
+
+    def edge_entropy(self) -> float:
+        """
+        The edge-entropy diversity, see Diversity.EdgeFrequency.diversity.
+        The edge table is updated with the rows which changed since the last call.
+        """
+        with timer(self.profiler, 'edge_entropy'):
+            if self.edge_table is None or self.edge_routes.shape != self.routes.shape:
+                self.edge_table = Diversity.EdgeFrequency(self.routes.shape[1])
+                self.edge_table.update(self.routes)
+            else:
+                changed = np.flatnonzero(np.any(self.routes != self.edge_routes, axis=1))
+                if len(changed):
+                    self.edge_table.update(self.routes[changed], self.edge_routes[changed])
+            self.edge_routes = self.routes.copy()
+            return self.edge_table.diversity(len(self.routes))
+
+    def hashes(self) -> list:
+        """
+        Get the tour hash of every individual, see Individual.tour_hash. They
+        are hashed again only when the population was changed otherwise than
+        by replace, which rehashes the row it writes.
+        :return: a list, the i-th value is the hash of the i-th individual
+        """
+        if self.row_hashes is None:
+            self.row_hashes = Diversity.tour_hashes(self.routes)
+            self.hash_counts = collections.Counter(self.row_hashes)
+        return self.row_hashes
+
+    def taken_hashes(self) -> collections.Counter:
+        """
+        :return: the tour hashes in the population with the number of rows of each
+        """
+        self.hashes()
+        return self.hash_counts
+
+    def best(self, costs: np.ndarray = None) -> (np.ndarray, float):
+        """
+        Find the shortest route without building its text.
+        :param costs: the route lengths, evaluated here when not given
+        :return: a tuple which represents (the route, its length)
+        """
+        if costs is None:
+            costs = self.route_distances()
+        best = int(np.argmin(costs))
+        return self.individual_list[best].route, float(costs[best])
+
+    def findLeastCost(self, costs: np.ndarray = None):
+        """
+        Find the shortest route of the population.
+        :param costs: the route lengths, evaluated here when not given
+        :return: a tuple which represents (the city sequence, its length)
+        """
+        with timer(self.profiler, 'findLeastCost'):
+            route, leastCost = self.best(costs)
+            seqList = []
+            for city in route:
+                seqList.append(str(self.city_list[city].seq))
+            return ' '.join(seqList), leastCost
 
 
 class TSPProblem:
-    def __init__(self, file_name, size):
+    def __init__(self, file_name, size, rounded: bool = False, cache: bool = True, cache_distance: bool = False,
+                 dense_limit: int = 5000, dtype=np.float64, candidates: int = None, seeded: float = 0., seed=None):
+        """
+        Initial a TSP Problem from a TSPLIB file.
+        :param file_name: the .tsp file, EDGE_WEIGHT_TYPE may be EUC_2D, CEIL_2D, ATT or GEO
+        :param size: the population size
+        :param rounded: whether the distances are rounded to integers as
+        TSPLIB defines them, the GA has always used the exact distances
+        :param cache: whether to keep the parsed file in a binary cache, see TSPLIB.load
+        :param cache_distance: whether to keep the dense distance matrix in a
+        .npy cache as well and memory-map it in later runs
+        :param dense_limit: larger problems compute the distances on the fly,
+        see DistanceMatrix
+        :param dtype: np.float64 or np.float32, the type of the dense matrix.
+        float32 halves its memory, route lengths are still summed in float64.
+        :param candidates: the number of nearest neighbours kept per city in
+        a CandidateList. Problems without a dense matrix get 10 by default.
+        :param seeded: the part of the population built by constructive
+        heuristics instead of randomly, see Population.seed
+        :param seed: the seed of the RandomStream every operator of the run
+        draws from, an int or a np.random.SeedSequence. None draws fresh entropy.
+        """
+        self.rng = RandomStream(seed)
         self.size = size
         population_number = size
 
-        city_list = []
-        problem = open(file_name, 'r')
-        self.n = int(linecache.getline(file_name, 4).split()[2])  # number of city
-        for i in range(self.n):
-            i, x, y = linecache.getline(file_name, i + 7).split()
-            city_list.append(City(int(x), int(y), int(i)))
-
-        self.population = Population(population_number, city_list)
+        problem = TSPLIB.load(file_name, cache)
+        self.n = problem['DIMENSION']  # number of city
+        coordinates = problem['coordinates']
+        city_list = [City(x, y, int(i)) for i, (x, y) in zip(problem['ids'], coordinates.tolist())]
+
+        metric = TSPLIB.metric(problem['EDGE_WEIGHT_TYPE'], rounded)
+        matrix = TSPLIB.load_distance(file_name, rounded, dtype) if cache_distance else None
+        self.distance = DistanceMatrix(coordinates, dense_limit, dtype, metric=metric, matrix=matrix)
+        if candidates is None and not self.distance.dense:
+            candidates = 10
+        if candidates:
+            self.distance.candidates = CandidateList(coordinates, candidates)
+        if cache_distance and matrix is None and self.distance.dense:
+            TSPLIB.save_distance(file_name, rounded, self.distance.matrix)
+        self.population = Population(population_number, city_list, self.distance, self.rng)
+        self.population.seed(seeded)
+        # an Instrumentation.Profiler, set by EvolutionaryAlgorithm
+        self.profiler = None
         self.fitness = self.all_fits()
         self.rate = 0.5  # Self-setting select rate
         self.tournament_size = 2  # Self-setting tournament_size
         self.elitism = 0.2  # Self-setting elitism para
-        problem.close()
+
+    def update_fitness(self) -> None:
+        """
+        Refresh the fitness after the population has changed.
+        """
+        with timer(self.profiler, 'fitness'):
+            self.fitness = self.all_fits()
 
     # Determine the fitness function
-    def all_fits(self) -> list:
-        fits = []
-        for i in self.population.individual_list:
-            fits.append(1. / i.route_distance())
-        return fits
+    def all_fits(self) -> np.ndarray:
+        return 1. / self.population.route_distances()
 
     # Calculate fitness sum
-    def sum(self) -> int:
-        total = 0
-        for i in range(len(self.fitness)):
-            total += self.fitness[i]
-        return total
+    def sum(self) -> float:
+        return float(np.sum(self.fitness))
 
     def selection(self, selection_method: int):
         """
-        Select individual from the population
+        Select individual from the population, see select
+        :return: a list of the selected individuals
+        """
+        return [self.population.individual_list[i] for i in self.select(selection_method).tolist()]
+
+    def select(self, selection_method: int) -> np.ndarray:
+        """
+        Select individuals from the fitness vector
         :param selection_method: this parameter represents a selection method.
         This is the mapping chart:
 
@@ -427,44 +793,27 @@ class TSPProblem:
         1 -> fitness-proportional
         2 -> tournament selection
         3 -> elitism
+        4 -> fitness-proportional by an alias table
+        :return: an array of the indices of the selected individuals
         """
+        size = int(len(self.fitness) * self.rate)
         # fitness proportionate selection (roulette wheel selection)
         if selection_method == 1:
-            fitness = np.array(self.fitness)
-            possibility = fitness / sum(fitness)
-            size = int(len(fitness) * self.rate)
-            best = np.random.choice([i for i in self.population.individual_list], size=size, p=possibility)
+            best = Selection.roulette(self.fitness, size, self.rng)
 
         # tournament selection
         elif selection_method == 2:
             if self.tournament_size >= len(self.population):
                 raise ValueError("Tournament size is larger than population size")
-            # competitors = random.sample(self.population.individual_list, self.tournament_size)
-            # dist = self.all_fits(competitors)
-            # mindist = min(dist)
-            # for i in range(len(competitors)):
-            #     if mindist == dist[i]:
-            #         best = competitors[i]
-            best = []
-            while len(best) < len(self.fitness) * self.rate:
-                x, y = random.sample(range(len(self.fitness)), self.tournament_size)
-                if self.fitness[x] >= self.fitness[y]:
-                    best.append(self.population.individual_list[x])
-                else:
-                    best.append(self.population.individual_list[y])
+            best = Selection.tournament(self.fitness, int(np.ceil(len(self.fitness) * self.rate)),
+                                        self.tournament_size, self.rng)
 
-        # elitism
+        # elitism, sorted by fitness, ties broken by the larger serial number
         elif selection_method == 3:
-            best = []
-            # Serial numbers correspond to fitness
-            it = {i: self.fitness[i] for i in range(len(self.fitness))}
-            # sorted by fitness
-            sorted_fitness = sorted(it.items(), key=lambda x: (x[1], x[0]), reverse=True)
-            size = int(len(self.fitness) * self.rate)
-            ilist = [sorted_fitness[: size][i][0] for i in range(size)]
-            for i in range(size):
-                best.append(self.population.individual_list[ilist[i]])
+            best = Selection.truncation(self.fitness, size)
+
+        elif selection_method == 4:
+            best = Selection.AliasTable(self.fitness).sample(size, self.rng)
         else:
             raise ValueError("Value is not permitted")
         return best  # sorted(best)
-
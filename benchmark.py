@@ -0,0 +1,142 @@
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from TSPProblem import City, Individual, Population, TSPProblem
+from EvolutionaryAlgorithm import EvolutionaryAlgorithm
+from RandomStream import RandomStream
+
+sizes = [51, 76, 101, 442, 2392]
+crossovers = {1: 'OX', 2: 'PMX', 3: 'CX', 4: 'ERX'}
+selections = {1: 'roulette', 2: 'tournament', 3: 'elitism', 4: 'alias roulette'}
+mutations = {1: 'insert', 2: 'swap', 3: 'inversion', 4: 'scramble', 5: 'neighbour inversion'}
+instances = ['eil51', 'eil76', 'eil101', 'st70', 'kroA100', 'kroC100', 'kroD100', 'lin105', 'pcb442', 'pr2392']
+
+
+def crossover_time(crossover_method: int, n: int, repeat: int = 200) -> float:
+    """
+    Measure the time of one crossover on random parents.
+    :param crossover_method: the crossover method of Population.crossover
+    :param n: the number of cities
+    :param repeat: how many crossovers are timed
+    :return: the mean time of a crossover in seconds
+    """
+    rng = RandomStream(0)
+    city_list = [City(rng.random(), rng.random(), i + 1) for i in range(n)]
+    population = Population(2, city_list, rng=rng)
+    parents = [tuple(Individual(rng.generator.permutation(n), city_list) for _ in range(2)) for _ in range(repeat)]
+    start = time.perf_counter()
+    for parent1, parent2 in parents:
+        population.crossover(crossover_method, parent1, parent2)
+    return (time.perf_counter() - start) / repeat
+
+
+def crossover_table() -> None:
+    print('n'.ljust(8) + ''.join(name.rjust(12) for name in crossovers.values()))
+    for n in sizes:
+        times = [crossover_time(method, n) for method in crossovers]
+        print(str(n).ljust(8) + ''.join(('%.1fus' % (t * 1e6)).rjust(12) for t in times))
+
+
+def measure(instance: str, algorithm, size: int, generations: int, memory_generations: int) -> dict:
+    """
+    Benchmark one operator combination on one instance.
+    :param instance: the name of the .tsp file
+    :param algorithm: [selection, crossover, mutation]
+    :param size: the population size
+    :param generations: the number of generations timed
+    :param memory_generations: the number of generations run under
+    tracemalloc to find the peak memory, which slows them down
+    :return: a dict of generations/second, evaluations/second and peak memory in bytes
+    """
+    Problem = TSPProblem(instance + '.tsp', size, candidates=10, seed=0)
+    temp = EvolutionaryAlgorithm(Problem, algorithm)
+    evaluations = Problem.population.evaluations
+    start = time.perf_counter()
+    for _ in range(generations):
+        temp.run()
+    seconds = time.perf_counter() - start
+    evaluations = Problem.population.evaluations - evaluations
+
+    tracemalloc.start()
+    for _ in range(memory_generations):
+        temp.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'generations/s': generations / seconds, 'evaluations/s': evaluations / seconds, 'peak bytes': peak}
+
+
+def suite(names, size: int, generations: int, memory_generations: int) -> dict:
+    """
+    Benchmark every selection x crossover x mutation combination on the instances.
+    :return: a dict from "instance s-c-m" to the result of measure, or to
+    {'error': message} for combinations which fail
+    """
+    results = {}
+    for instance in names:
+        for s in selections:
+            for c in crossovers:
+                for m in mutations:
+                    key = '%s %d-%d-%d' % (instance, s, c, m)
+                    try:
+                        results[key] = measure(instance, [s, c, m], size, generations, memory_generations)
+                    except Exception as error:
+                        results[key] = {'error': '%s: %s' % (type(error).__name__, error)}
+                    print(key.ljust(24) + format_result(results[key]), flush=True)
+    return results
+
+
+def format_result(result: dict) -> str:
+    if 'error' in result:
+        return 'error ' + result['error']
+    return '%10.1f gen/s %12.1f eval/s %10.1f KiB' % (
+        result['generations/s'], result['evaluations/s'], result['peak bytes'] / 1024)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Find the combinations which got slower than the baseline, or which
+    started to fail.
+    :param tolerance: the allowed relative drop of generations/second
+    :return: a list of messages, empty when there is no regression
+    """
+    regressions = []
+    for key, old in baseline.items():
+        new = results.get(key)
+        if new is None or 'error' in old:
+            continue
+        if 'error' in new:
+            regressions.append('%s fails: %s' % (key, new['error']))
+        elif new['generations/s'] < old['generations/s'] * (1 - tolerance):
+            regressions.append('%s: %.1f gen/s, baseline %.1f gen/s' % (
+                key, new['generations/s'], old['generations/s']))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the GA operators on the bundled instances')
+    parser.add_argument('--crossover', action='store_true', help='only time single crossovers for n = 51 to 2392')
+    parser.add_argument('--instances', nargs='+', default=instances)
+    parser.add_argument('--size', type=int, default=50, help='population size')
+    parser.add_argument('--generations', type=int, default=20, help='generations timed per combination')
+    parser.add_argument('--memory-generations', type=int, default=2, help='generations run under tracemalloc')
+    parser.add_argument('--baseline', help='a JSON file of earlier results to compare with')
+    parser.add_argument('--save', help='write the results as JSON, e.g. as the next baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed drop of generations/second')
+    args = parser.parse_args()
+
+    if args.crossover:
+        crossover_table()
+        sys.exit()
+
+    results = suite(args.instances, args.size, args.generations, args.memory_generations)
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump(results, output, indent=1, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,214 @@
+import os
+import csv
+import sys
+import json
+import argparse
+import itertools
+import numpy as np
+from ExperimentRunner import algorithm_name, job_checksum, job_label, job_seed, run_jobs, stopping_rules
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# the keys of a spec which can hold one value or a list of values to sweep over
+swept = ['instances', 'algorithms', 'sizes', 'generations', 'replacement', 'batched', 'unique'] + stopping_rules
+# the keys of a job which the swept keys are given to
+job_keys = {'instances': 'filename', 'algorithms': 'algorithm', 'sizes': 'size'}
+defaults = dict({'generations': 1000, 'replacement': 1, 'batched': False, 'unique': False, 'repeats': 1, 'seed': 0,
+                 'workers': None, 'output': 'sweep', 'log': 'none', 'log_every': 100, 'report': [],
+                 'checkpoint_every': None, 'format': 'csv'}, **{rule: None for rule in stopping_rules})
+extensions = {'csv': '.csv', 'json': '.json', 'text': '.txt'}
+
+
+def load_spec(file_name: str) -> dict:
+    """
+    Read a sweep spec from a JSON file, or a YAML file if PyYAML is installed.
+    The keys are:
+    instances: the names of the .tsp files, e.g. ["eil51", "kroA100"]
+    algorithms: the [selection, crossover, mutation] ids to run
+    sizes: the population sizes
+    generations, replacement, batched, unique: see EvolutionaryAlgorithm,
+    each a value or a list of values
+    stall, min_diversity, target_cost, seconds, evaluations: the budgets
+    of evolve, each a value or a list of values, null for none. A run stops
+    at the first budget it reaches, generations can be null if another is given.
+    repeats: the runs of every configuration, seed: the base seed they derive their seeds from
+    workers: the number of processes, all the cores by default
+    output: the directory of the results
+    log: 'none', 'text' or 'binary' (ResultLog snapshots), every log_every generations
+    report: the generations after which the best cost is kept
+    checkpoint_every: checkpoint the runs so an interrupted sweep resumes them
+    format: the summary table as 'csv', 'json' or 'text'
+    :return: the spec with the defaults filled in
+    """
+    with open(file_name) as spec_file:
+        if file_name.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ImportError("Reading %s needs PyYAML, or write the spec as JSON" % file_name)
+            spec = yaml.safe_load(spec_file)
+        else:
+            spec = json.load(spec_file)
+    for key in ('instances', 'algorithms', 'sizes'):
+        if key not in spec:
+            raise ValueError("The spec has no %s" % key)
+    unknown = set(spec) - set(swept) - set(defaults)
+    if unknown:
+        raise ValueError("Unknown keys in the spec: %s" % ', '.join(sorted(unknown)))
+    if spec.get('log', 'none') not in ('none', 'text', 'binary') or spec.get('format', 'csv') not in extensions:
+        raise ValueError("Value is not permitted")
+    spec = dict(defaults, **spec)
+    if None in as_list(spec['generations']) and all(None in as_list(spec[rule]) for rule in stopping_rules):
+        raise ValueError("A run without generations needs another stopping rule")
+    return spec
+
+
+def as_list(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+
+def config_name(job: dict, log: str) -> str:
+    """
+    Name a job after everything which changes its result, the readable part
+    followed by a checksum of the rest.
+    :param log: the log mode of the spec, the result holds the text log only in the 'text' one
+    """
+    return '%s-%s-%d-%08x' % (job['filename'], algorithm_name(job['algorithm']), job['size'],
+                              job_checksum(dict(job, log=log)))
+
+
+def expand(spec: dict) -> list:
+    """
+    Turn a spec into one job per configuration and repeat, see ExperimentRunner.run_job.
+    """
+    directory = os.path.join(spec['output'], 'jobs')
+    jobs = []
+    values = [as_list(spec[key]) for key in swept]
+    # a single algorithm may be given as [s, c, m] instead of [[s, c, m]]
+    if values[1] and not isinstance(values[1][0], list):
+        values[1] = [values[1]]
+    for config in itertools.product(*values):
+        for repeat in range(spec['repeats']):
+            job = {job_keys.get(key, key): value for key, value in zip(swept, config)}
+            job.update({'repeat': repeat, 'seed': job_seed(spec['seed'], job['filename'], job['size'],
+                                                           job['algorithm'], repeat),
+                        'log_every': spec['log_every'] if spec['log'] != 'none' else None,
+                        'report': [g for g in spec['report'] if job['generations'] is None or g <= job['generations']]})
+            name = os.path.join(directory, config_name(job, spec['log']))
+            job['result'] = name + '.json'
+            if spec['log'] == 'binary':
+                job['snapshots'] = name + '.snap'
+            if spec['checkpoint_every']:
+                job['checkpoint'] = name + '.checkpoint.npz'
+                job['checkpoint_every'] = spec['checkpoint_every']
+            jobs.append(job)
+    return jobs
+
+
+def summarize(jobs: list, results: list) -> list:
+    """
+    Aggregate the repeats of every configuration.
+    :return: one row per configuration with its settings, the mean,
+    standard deviation and best final cost, the mean time and generations
+    of a run and how many runs stopped for which reason
+    """
+    groups = {}
+    for job, result in zip(jobs, results):
+        key = tuple(json.dumps(job[job_keys.get(key, key)]) for key in swept)
+        groups.setdefault(key, (job, []))[1].append(result)
+    rows = []
+    for job, group in groups.values():
+        costs = np.array([result['cost'] for result in group])
+        row = {'instance': job['filename'], 'algorithm': algorithm_name(job['algorithm']), 'size': job['size']}
+        row.update({key: job[key] for key in swept if key not in job_keys})
+        reasons = [result['stop_reason'] for result in group]
+        row.update({'runs': len(group), 'mean': float(costs.mean()),
+                    'std': float(costs.std(ddof=1)) if len(costs) > 1 else 0., 'best': float(costs.min()),
+                    'run_seconds': float(np.mean([result['seconds'] for result in group])),
+                    'run_generations': float(np.mean([result['generations'] for result in group])),
+                    'stop': ' '.join('%s:%d' % (reason, reasons.count(reason)) for reason in sorted(set(reasons)))})
+        rows.append(row)
+    return rows
+
+
+def write_summary(rows: list, file_name: str, format: str) -> None:
+    with open(file_name, 'w', newline='') as output:
+        if format == 'json':
+            json.dump(rows, output, indent=1)
+        elif format == 'csv':
+            writer = csv.DictWriter(output, fieldnames=list(rows[0]) if rows else [])
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            fields = list(rows[0]) if rows else []
+            cells = [[('%.2f' % row[field]) if isinstance(row[field], float) else str(row[field])
+                      for field in fields] for row in rows]
+            widths = [max([len(field)] + [len(line[i]) for line in cells]) for i, field in enumerate(fields)]
+            output.write('  '.join(field.rjust(width) for field, width in zip(fields, widths)) + '\n')
+            for line in cells:
+                output.write('  '.join(cell.rjust(width) for cell, width in zip(line, widths)) + '\n')
+
+
+def write_logs(jobs: list, results: list, directory: str) -> None:
+    """
+    Write the text logs of the runs, in the layout of test1.py, one file per instance.
+    """
+    logs = {}
+    for job, result in zip(jobs, results):
+        if job['filename'] not in logs:
+            logs[job['filename']] = open(os.path.join(directory, job['filename'] + '.txt'), 'w')
+        log = logs[job['filename']]
+        log.write(job_label(job) + '\n')
+        for solution in result['log']:
+            log.write(solution + '\n')
+        log.write('\r\n')
+    for log in logs.values():
+        log.close()
+
+
+def sweep(spec: dict, workers: int = None) -> list:
+    """
+    Run the jobs of a spec which have no result yet and write the summary
+    of all of them to <output>/summary.csv, .json or .txt.
+    :return: the rows of the summary
+    """
+    jobs = expand(spec)
+    os.makedirs(os.path.join(spec['output'], 'jobs'), exist_ok=True)
+    results = [None] * len(jobs)
+    todo = []
+    for i, job in enumerate(jobs):
+        if os.path.exists(job['result']):
+            with open(job['result']) as result:
+                results[i] = json.load(result)
+        else:
+            todo.append(i)
+    print('%d jobs, %d finished, running %d' % (len(jobs), len(jobs) - len(todo), len(todo)), flush=True)
+    for i, result in zip(todo, run_jobs([jobs[i] for i in todo], workers or spec['workers'])):
+        results[i] = result
+        job = jobs[i]
+        print('%s repeat %d: %.2f in %.1fs, %d generations, stopped by %s' % (
+            job_label(job), job['repeat'], result['cost'], result['seconds'], result['generations'],
+            result['stop_reason']), flush=True)
+
+    if spec['log'] == 'text':
+        write_logs(jobs, results, spec['output'])
+    rows = summarize(jobs, results)
+    write_summary(rows, os.path.join(spec['output'], 'summary' + extensions[spec['format']]), spec['format'])
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a sweep of GA configurations from a JSON or YAML spec')
+    parser.add_argument('spec', help='the spec file, see load_spec for its keys')
+    parser.add_argument('--workers', type=int, default=None, help='overrides the workers of the spec')
+    parser.add_argument('--dry-run', action='store_true', help='only list the jobs and which of them are finished')
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec)
+    if args.dry_run:
+        for job in expand(spec):
+            print(('done ' if os.path.exists(job['result']) else 'todo ') + job_label(job) +
+                  ' repeat:%d -> %s' % (job['repeat'], job['result']))
+        sys.exit()
+    sweep(spec, args.workers)